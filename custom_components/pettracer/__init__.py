@@ -4,37 +4,87 @@ from __future__ import annotations
 import logging
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+from homeassistant.helpers.typing import ConfigType
 
 from .const import DOMAIN
-from .coordinator import PetTracerCoordinator
+from .hub import account_key, async_get_hub, snapshot_store
+from .services import async_setup_services
 
 PLATFORMS: list[Platform] = [Platform.DEVICE_TRACKER, Platform.SENSOR, Platform.SELECT, Platform.BINARY_SENSOR, Platform.SWITCH]
 
 _LOGGER = logging.getLogger(__name__)
 
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the PetTracer services."""
+    async_setup_services(hass)
+    return True
+
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up PetTracer from a config entry."""
     _LOGGER.info("Setting up PetTracer integration for entry: %s", entry.entry_id)
-    coordinator = PetTracerCoordinator(hass, entry)
-    await coordinator.async_config_entry_first_refresh()
-    
-    hass.data.setdefault(DOMAIN, {})[entry.entry_id] = coordinator
+    # Entries for the same account share one coordinator and connection
+    coordinator = await async_get_hub(hass).async_acquire(entry)
+    hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
+    @callback
+    def async_retire_devices(added: set[str], removed: set[str]) -> None:
+        """Remove devices that left the account, taking their entities along."""
+        registry = dr.async_get(hass)
+        for dev_id in removed:
+            device = registry.async_get_device(identifiers={(DOMAIN, dev_id)})
+            if device is not None and entry.entry_id in device.config_entries:
+                _LOGGER.info("Removing PetTracer device %s, it left the account", dev_id)
+                registry.async_update_device(
+                    device.id, remove_config_entry_id=entry.entry_id
+                )
+
+    entry.async_on_unload(coordinator.async_add_device_set_listener(async_retire_devices))
+    entry.async_on_unload(entry.add_update_listener(async_options_updated))
     
     # Start WebSocket connection - after platforms to ensure listeners might be ready if needed, 
-    # but more importantly after first refresh so we have device IDs.
-    _LOGGER.debug("Starting PetTracer WebSocket...")
-    await coordinator.start_websocket()
+    # but more importantly after first refresh or snapshot so we have device IDs.
+    if coordinator.ws_client is None:
+        _LOGGER.debug("Starting PetTracer WebSocket...")
+        await coordinator.start_websocket()
 
     return True
 
+async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options without reloading."""
+    hass.data[DOMAIN][entry.entry_id].async_apply_options()
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
-        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
-        # Ensure we stop the websocket connection
-        await coordinator.stop_websocket()
+        hass.data[DOMAIN].pop(entry.entry_id)
+        # Stops the websocket connection and token refreshes once no other
+        # entry uses the account
+        await async_get_hub(hass).async_release(entry)
 
     return unload_ok
+
+async def async_remove_config_entry_device(
+    hass: HomeAssistant, entry: ConfigEntry, device: dr.DeviceEntry
+) -> bool:
+    """Allow removing a device the account no longer reports."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    return not any(
+        domain == DOMAIN and identifier in coordinator.data
+        for domain, identifier in device.identifiers
+    )
+
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Delete the saved snapshot once no entry uses the account."""
+    key = account_key(entry.data)
+    if not any(
+        account_key(other.data) == key
+        for other in hass.config_entries.async_entries(DOMAIN)
+        if other.entry_id != entry.entry_id
+    ):
+        await snapshot_store(hass, key).async_remove()
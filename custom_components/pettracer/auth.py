@@ -0,0 +1,139 @@
+"""Access token handling for PetTracer."""
+from __future__ import annotations
+
+import asyncio
+import base64
+import logging
+import time
+
+import aiohttp
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from . import codec
+from .const import API_BASE_URL, API_ENDPOINT_LOGIN, TOKEN_REFRESH_MARGIN_SECONDS
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def token_expiry(token: str) -> float | None:
+    """Return the expiry of a JWT as a UNIX timestamp, None if unknown."""
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = parts[1] + "=" * (-len(parts[1]) % 4)
+        exp = codec.loads(base64.urlsafe_b64decode(payload)).get("exp")
+    except (ValueError, AttributeError):
+        return None
+    return float(exp) if isinstance(exp, (int, float)) else None
+
+
+def login_expiry(data: dict) -> float | None:
+    """Return the token expiry of a login response as a UNIX timestamp."""
+    expires_in = data.get("expires_in")
+    if isinstance(expires_in, (int, float)):
+        return time.time() + expires_in
+    access_token = data.get("access_token")
+    return token_expiry(access_token) if access_token else None
+
+
+class TokenManager:
+    """Hand out the PetTracer access token.
+
+    Concurrent callers needing a login share a single request, a rejected
+    token is only dropped once however many requests saw the 401, and a
+    token carrying an expiry is renewed shortly before it runs out.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session: aiohttp.ClientSession,
+        email: str | None,
+        password: str | None,
+        access_token: str | None = None,
+    ) -> None:
+        """Initialize the manager."""
+        self.hass = hass
+        self.session = session
+        self.email = email
+        self.password = password
+        self.access_token = access_token
+        self.login_count = 0
+        self._lock = asyncio.Lock()
+        self._refresh_unsub: CALLBACK_TYPE | None = None
+
+    async def async_get_token(self) -> str:
+        """Return a token, logging in if there is none."""
+        if self.access_token:
+            return self.access_token
+        async with self._lock:
+            # Another caller may have logged in while we waited
+            if not self.access_token:
+                await self._async_login()
+            return self.access_token
+
+    @callback
+    def async_invalidate(self, token: str) -> None:
+        """Drop a token the API rejected, unless it was already replaced."""
+        if self.access_token == token:
+            _LOGGER.debug("Access token rejected, logging in again on next use")
+            self.access_token = None
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Stop refreshing the token."""
+        if self._refresh_unsub is not None:
+            self._refresh_unsub()
+            self._refresh_unsub = None
+
+    async def _async_login(self) -> None:
+        """Log in and store the new token."""
+        if not self.email or not self.password:
+            raise UpdateFailed("No credentials available for PetTracer")
+
+        try:
+            url = f"{API_BASE_URL}{API_ENDPOINT_LOGIN}"
+            payload = {
+                "login": self.email,
+                "password": self.password,
+            }
+            async with self.session.post(url, json=payload) as response:
+                response.raise_for_status()
+                data = await response.json()
+        except Exception as err:
+            raise UpdateFailed(f"Login failed: {err}")
+
+        access_token = data.get("access_token")
+        if not access_token:
+            raise UpdateFailed("Login successful but no access token found")
+
+        self.login_count += 1
+        self.async_set_token(access_token, login_expiry(data))
+
+    @callback
+    def async_set_token(self, access_token: str, expiry: float | None = None) -> None:
+        """Store a token and schedule its renewal."""
+        self.access_token = access_token
+        self.async_shutdown()
+        if expiry is None:
+            expiry = token_expiry(access_token)
+        if expiry is not None:
+            delay = max(expiry - time.time() - TOKEN_REFRESH_MARGIN_SECONDS, 0)
+            _LOGGER.debug("Refreshing access token in %.0f seconds", delay)
+            self._refresh_unsub = async_call_later(
+                self.hass, delay, self._async_scheduled_refresh
+            )
+
+    async def _async_scheduled_refresh(self, _now=None) -> None:
+        """Renew the token before it expires."""
+        self._refresh_unsub = None
+        async with self._lock:
+            try:
+                await self._async_login()
+            except UpdateFailed as err:
+                # Keep using the current token, a 401 will trigger a login
+                _LOGGER.warning("Proactive token refresh failed: %s", err)
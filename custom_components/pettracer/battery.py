@@ -0,0 +1,150 @@
+"""Battery level and drain estimation for PetTracer collars."""
+from __future__ import annotations
+
+import math
+import time
+from typing import Any
+
+# Collars report the battery voltage in mV, readings outside this range are
+# clamped to it
+MIN_MILLIVOLTS = 3000
+MAX_MILLIVOLTS = 4150
+
+# Shortest time between two readings used for a drain rate. Readings jitter
+# by a few mV, so closer samples would mostly measure noise.
+MIN_SAMPLE_SECONDS = 3600
+# Time constant of the moving average over drain rates
+RATE_TIME_CONSTANT_SECONDS = 12 * 3600
+# A level rise bigger than this means the collar was charged unnoticed
+RECHARGE_THRESHOLD = 5.0
+# State store key stamped whenever a device's drain estimate changes
+BATTERY_ESTIMATE = "_battery_estimate"
+
+
+def _curve(mv: int) -> float:
+    """Return the charge in percent for a voltage, following the portal."""
+    if mv >= 4000:
+        return (mv - 4000) / 150 * 17 + 83
+    if mv >= 3900:
+        return (mv - 3900) / 100 * 16 + 67
+    if mv >= 3840:
+        return (mv - 3840) / 60 * 17 + 50
+    if mv >= 3760:
+        return (mv - 3760) / 80 * 16 + 34
+    if mv >= 3600:
+        return (mv - 3600) / 160 * 17 + 17
+    return 0.0
+
+
+# Charge in percent for every mV from MIN_MILLIVOLTS to MAX_MILLIVOLTS
+_LEVELS = tuple(_curve(mv) for mv in range(MIN_MILLIVOLTS, MAX_MILLIVOLTS + 1))
+
+
+def battery_level(value: Any) -> float | None:
+    """Return the unrounded charge in percent for a reading, None if invalid."""
+    try:
+        mv = int(value)
+    except (ValueError, TypeError):
+        return None
+    return _LEVELS[max(MIN_MILLIVOLTS, min(mv, MAX_MILLIVOLTS)) - MIN_MILLIVOLTS]
+
+
+def battery_percent(value: Any) -> int | None:
+    """Return the charge in whole percent for a reading, None if invalid."""
+    level = battery_level(value)
+    return round(level) if level is not None else None
+
+
+class _Drain:
+    """Drain state of one collar."""
+
+    __slots__ = ("level", "charging", "since", "since_level", "rate")
+
+    def __init__(self) -> None:
+        self.level: float | None = None
+        self.charging = False
+        # Start of the current sample and the level at that time
+        self.since: float | None = None
+        self.since_level = 0.0
+        # Smoothed drain in percent per hour
+        self.rate: float | None = None
+
+
+class DrainEstimator:
+    """Estimate how fast each collar's battery drains.
+
+    Readings are folded into a moving average of the drain rate as they
+    arrive, so no history is kept. Charging pauses the estimate; the rate
+    learned before carries over to the next discharge.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = MIN_SAMPLE_SECONDS,
+        time_constant: float = RATE_TIME_CONSTANT_SECONDS,
+    ) -> None:
+        """Initialize the estimator."""
+        self._min_interval = min_interval
+        self._time_constant = time_constant
+        self._devices: dict[str, _Drain] = {}
+
+    def record(
+        self, dev_id: str, bat: Any, chg: Any, now: float | None = None
+    ) -> None:
+        """Take a battery reading and charging flag into account."""
+        level = battery_level(bat) if bat else None
+        if level is None:
+            return
+        if now is None:
+            now = time.monotonic()
+
+        drain = self._devices.get(dev_id)
+        if drain is None:
+            drain = self._devices[dev_id] = _Drain()
+        drain.level = level
+        drain.charging = bool(chg)
+
+        if (
+            drain.charging
+            or drain.since is None
+            or level - drain.since_level > RECHARGE_THRESHOLD
+        ):
+            # Start over from this reading once discharging
+            drain.since = None if drain.charging else now
+            drain.since_level = level
+            return
+
+        elapsed = now - drain.since
+        if elapsed < self._min_interval:
+            return
+        rate = (drain.since_level - level) * 3600 / elapsed
+        if drain.rate is None:
+            drain.rate = rate
+        else:
+            drain.rate += (1 - math.exp(-elapsed / self._time_constant)) * (
+                rate - drain.rate
+            )
+        drain.since = now
+        drain.since_level = level
+
+    def rate(self, dev_id: str) -> float | None:
+        """Return the drain in percent per hour, None until known."""
+        drain = self._devices.get(dev_id)
+        return drain.rate if drain is not None else None
+
+    def hours_left(self, dev_id: str) -> float | None:
+        """Return the hours until the battery is empty, None if unknown."""
+        drain = self._devices.get(dev_id)
+        if (
+            drain is None
+            or drain.charging
+            or drain.rate is None
+            or drain.rate <= 0
+            or drain.level is None
+        ):
+            return None
+        return drain.level / drain.rate
+
+    def remove(self, dev_id: str) -> None:
+        """Forget a device."""
+        self._devices.pop(dev_id, None)
@@ -8,11 +8,10 @@ from homeassistant.components.binary_sensor import (
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.helpers.entity import DeviceInfo
 
 from .const import DOMAIN
 from .coordinator import PetTracerCoordinator
+from .entity import PetTracerEntity, async_add_device_entities
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -21,24 +20,28 @@ async def async_setup_entry(
 ) -> None:
     """Set up PetTracer binary sensors."""
     coordinator: PetTracerCoordinator = hass.data[DOMAIN][entry.entry_id]
-    
+    async_add_device_entities(coordinator, entry, async_add_entities, _device_entities)
+
+
+def _device_entities(
+    coordinator: PetTracerCoordinator, dev_id: str, device_data: dict
+) -> list[PetTracerBinarySensor]:
+    """Return the binary sensors of a device."""
     entities = []
-    for dev_id, device_data in coordinator.data.items():
-        if "home" in device_data:
-            entities.append(PetTracerBinarySensor(coordinator, dev_id, "home", "Home", BinarySensorDeviceClass.PRESENCE))
-        
-        if "led" in device_data:
-            entities.append(PetTracerBinarySensor(coordinator, dev_id, "led", "LED Status", None, "mdi:led-on"))
-        
-        if "buz" in device_data:
-            entities.append(PetTracerBinarySensor(coordinator, dev_id, "buz", "Buzzer Status", None, "mdi:bell-ring"))
-        
-        if "chg" in device_data:
-            entities.append(PetTracerBinarySensor(coordinator, dev_id, "chg", "Charging", BinarySensorDeviceClass.BATTERY_CHARGING))
+    if "home" in device_data:
+        entities.append(PetTracerBinarySensor(coordinator, dev_id, "home", "Home", BinarySensorDeviceClass.PRESENCE))
     
-    async_add_entities(entities)
+    if "led" in device_data:
+        entities.append(PetTracerBinarySensor(coordinator, dev_id, "led", "LED Status", None, "mdi:led-on"))
+    
+    if "buz" in device_data:
+        entities.append(PetTracerBinarySensor(coordinator, dev_id, "buz", "Buzzer Status", None, "mdi:bell-ring"))
+    
+    if "chg" in device_data:
+        entities.append(PetTracerBinarySensor(coordinator, dev_id, "chg", "Charging", BinarySensorDeviceClass.BATTERY_CHARGING))
+    return entities
 
-class PetTracerBinarySensor(CoordinatorEntity, BinarySensorEntity):
+class PetTracerBinarySensor(PetTracerEntity, BinarySensorEntity):
     """Representation of a PetTracer binary sensor."""
 
     def __init__(
@@ -51,9 +54,9 @@ class PetTracerBinarySensor(CoordinatorEntity, BinarySensorEntity):
         icon: str | None = None
     ) -> None:
         """Initialize the binary sensor."""
-        super().__init__(coordinator)
-        self._dev_id = dev_id
         self._key = key
+        self._watched_keys = frozenset((key,))
+        super().__init__(coordinator, dev_id)
         self._name_suffix = name_suffix
         self._attr_device_class = device_class
         self._attr_icon = icon
@@ -63,27 +66,6 @@ class PetTracerBinarySensor(CoordinatorEntity, BinarySensorEntity):
         """Return the unique ID."""
         return f"{self._dev_id}_{self._key}"
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        name = details.get("name") or f"Pet {self._dev_id}"
-        return DeviceInfo(
-            identifiers={(DOMAIN, str(self._dev_id))},
-            name=name,
-            manufacturer="PetTracer",
-            model="GPS Collar",
-            sw_version=self.coordinator.data.get(self._dev_id, {}).get("sw"),
-            configuration_url="https://portal.pettracer.com/",
-        )
-
-    @property
-    def name(self) -> str:
-        """Return the name of the entity."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        base_name = details.get("name") or f"Pet {self._dev_id}"
-        return f"{base_name} {self._name_suffix}"
-
     @property
     def is_on(self) -> bool | None:
         """Return true if the binary sensor is on."""
@@ -0,0 +1,34 @@
+"""JSON encoding and decoding for PetTracer.
+
+Uses orjson when it is installed (it ships with Home Assistant) and falls
+back to the standard library otherwise. Both produce the same compact output
+as JavaScript's JSON.stringify, which is what the PetTracer portal sends.
+"""
+from __future__ import annotations
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+if orjson is not None:
+    BACKEND = "orjson"
+    loads = orjson.loads
+
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a compact JSON string."""
+        return orjson.dumps(obj).decode()
+
+else:
+    BACKEND = "json"
+    loads = json.loads
+
+    def dumps(obj: Any) -> str:
+        """Serialize obj to a compact JSON string."""
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,236 @@
+"""Command queue and confirmation tracking for PetTracer collars."""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from collections import deque
+from functools import partial
+from typing import Any, Awaitable, Callable
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+
+_LOGGER = logging.getLogger(__name__)
+
+_ANY = object()
+
+# Round-trip latencies kept per actuator
+LATENCY_SAMPLES = 100
+# State store key stamped whenever the pending commands of a device change
+PENDING_COMMANDS = "_pending_commands"
+
+
+class CommandQueue:
+    """Send collar commands without flooding the API.
+
+    Each device has its own queue worked through in order, one command at a
+    time. A command for an actuator that still has one waiting replaces it
+    in place, and the superseded caller returns straight away. Different
+    devices are served concurrently, up to max_concurrent requests in total.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        send: Callable[[str, str, Any], Awaitable[None]],
+        max_concurrent: int,
+        on_sent: Callable[[str, str, Any], None] | None = None,
+    ) -> None:
+        """Initialize the queue."""
+        self.hass = hass
+        self._send = send
+        self._on_sent = on_sent
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # dev_id -> actuator -> (value, future of the caller waiting on it)
+        self._queues: dict[str, dict[str, tuple[Any, asyncio.Future]]] = {}
+        self._workers: dict[str, asyncio.Task] = {}
+        self.superseded = 0
+
+    @property
+    def depth(self) -> int:
+        """Return the number of commands waiting to be sent."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    async def async_submit(self, dev_id: str, actuator: str, value: Any) -> None:
+        """Queue a command and wait until it is sent or superseded."""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.setdefault(dev_id, {})
+
+        previous = queue.get(actuator)
+        if previous is not None:
+            _LOGGER.debug(
+                "Command %s=%s for %s superseded by %s",
+                actuator, previous[0], dev_id, value,
+            )
+            self.superseded += 1
+            if not previous[1].done():
+                previous[1].set_result(None)
+        queue[actuator] = (value, future)
+
+        if dev_id not in self._workers:
+            self._workers[dev_id] = self.hass.async_create_background_task(
+                self._async_work(dev_id), f"pettracer commands {dev_id}"
+            )
+
+        await future
+
+    async def _async_work(self, dev_id: str) -> None:
+        """Send a device's queued commands in order."""
+        queue = self._queues[dev_id]
+        try:
+            while queue:
+                actuator = next(iter(queue))
+                async with self._semaphore:
+                    # Re-read, a newer value may have arrived while we waited
+                    value, future = queue.pop(actuator)
+                    try:
+                        await self._send(dev_id, actuator, value)
+                    except Exception as err:
+                        if not future.done():
+                            future.set_exception(err)
+                        continue
+                    else:
+                        if not future.done():
+                            future.set_result(None)
+                    finally:
+                        # Cancelled mid-send, e.g. on shutdown: the caller
+                        # must not wait forever for a command no longer queued
+                        if not future.done():
+                            future.cancel()
+                if self._on_sent:
+                    self._on_sent(dev_id, actuator, value)
+        finally:
+            del self._workers[dev_id]
+            if not queue and self._queues.get(dev_id) is queue:
+                del self._queues[dev_id]
+
+    async def async_shutdown(self) -> None:
+        """Cancel all queued commands and the ones being sent."""
+        workers = list(self._workers.values())
+        for task in workers:
+            task.cancel()
+        for queue in self._queues.values():
+            for _, future in queue.values():
+                future.cancel()
+        self._queues.clear()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def _confirms(actuator: str, value: Any, fields: dict[str, Any]) -> bool:
+    """Return whether pushed fields show a command took effect."""
+    if actuator == "mode":
+        return fields.get("mode") == value or fields.get("cmdNr") == value
+    # LED and buzzer commands use 1 = On, 2 = Off and report booleans
+    reported = fields.get(actuator)
+    return reported is not None and bool(reported) == (value == 1)
+
+
+class CommandTracker:
+    """Match issued commands with the device updates confirming them.
+
+    A command stays pending until an update for its device reports the
+    requested value. If none does within the timeout, on_timeout is called
+    with the device ID so its state can be fetched directly.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        timeout: float,
+        on_timeout: Callable[[str], None],
+    ) -> None:
+        """Initialize the tracker."""
+        self.hass = hass
+        self._timeout = timeout
+        self._on_timeout = on_timeout
+        # dev_id -> actuator -> (value, monotonic time issued, timer cancel)
+        self._pending: dict[str, dict[str, tuple[Any, float, CALLBACK_TYPE]]] = {}
+        # Recent round-trip latencies per actuator, in ms
+        self.latency: dict[str, deque[float]] = {}
+        self.confirmed = 0
+        self.timed_out = 0
+
+    def is_pending(self, dev_id: str, actuator: str) -> bool:
+        """Return whether a command awaits confirmation."""
+        return actuator in self._pending.get(dev_id, ())
+
+    @property
+    def depth(self) -> int:
+        """Return the number of commands awaiting confirmation."""
+        return sum(len(pending) for pending in self._pending.values())
+
+    @callback
+    def track(self, dev_id: str, actuator: str, value: Any) -> None:
+        """Start waiting for a command to be confirmed."""
+        self.discard(dev_id, actuator)
+        cancel = async_call_later(
+            self.hass, self._timeout, partial(self._async_expired, dev_id)
+        )
+        self._pending.setdefault(dev_id, {})[actuator] = (
+            value, time.monotonic(), cancel
+        )
+
+    @callback
+    def discard(self, dev_id: str, actuator: str, value: Any = _ANY) -> None:
+        """Stop waiting for a command, e.g. because sending it failed.
+
+        When a value is given, a newer command for the actuator with another
+        value is left pending.
+        """
+        pending = self._pending.get(dev_id)
+        if pending and actuator in pending and (
+            value is _ANY or pending[actuator][0] == value
+        ):
+            pending.pop(actuator)[2]()
+            if not pending:
+                del self._pending[dev_id]
+
+    @callback
+    def process(self, dev_id: str, fields: dict[str, Any]) -> bool:
+        """Check an update against pending commands, True if any confirmed."""
+        pending = self._pending.get(dev_id)
+        if not pending:
+            return False
+        confirmed = False
+        for actuator, (value, issued, _) in list(pending.items()):
+            if _confirms(actuator, value, fields):
+                elapsed = (time.monotonic() - issued) * 1000
+                _LOGGER.debug(
+                    "Command %s=%s for %s confirmed after %.0fms",
+                    actuator, value, dev_id, elapsed,
+                )
+                self.latency.setdefault(actuator, deque(maxlen=LATENCY_SAMPLES)).append(
+                    elapsed
+                )
+                self.confirmed += 1
+                self.discard(dev_id, actuator)
+                confirmed = True
+        return confirmed
+
+    @callback
+    def expire(self, dev_id: str) -> None:
+        """Give up on the pending commands of a device that timed out.
+
+        Commands issued later keep waiting, with their own timers running.
+        """
+        now = time.monotonic()
+        for actuator, (_, issued, _) in list(self._pending.get(dev_id, {}).items()):
+            if now - issued < self._timeout:
+                continue
+            _LOGGER.debug("Command %s for %s was not confirmed", actuator, dev_id)
+            self.timed_out += 1
+            self.discard(dev_id, actuator)
+
+    @callback
+    def _async_expired(self, dev_id: str, _now=None) -> None:
+        """Handle a command timing out."""
+        self._on_timeout(dev_id)
+
+    @callback
+    def async_shutdown(self) -> None:
+        """Cancel all timers."""
+        for pending in self._pending.values():
+            for _, _, cancel in pending.values():
+                cancel()
+        self._pending.clear()
@@ -7,12 +7,28 @@ from typing import Any
 import voluptuous as vol
 
 from homeassistant import config_entries
+from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
 from homeassistant.helpers import selector
 
-from .const import DOMAIN, CONF_EMAIL, CONF_PASSWORD, API_BASE_URL, API_ENDPOINT_LOGIN
+from .const import (
+    DOMAIN,
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    CONF_WS_COALESCE_WINDOW,
+    DEFAULT_WS_COALESCE_WINDOW,
+    CONF_TRACE_SAMPLE_RATE,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    CONF_GEOFENCES,
+    API_BASE_URL,
+    API_ENDPOINT_LOGIN,
+)
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
 
+from .auth import login_expiry
+from .geofence import polygon_fences
+from .hub import async_get_hub
+
 _LOGGER = logging.getLogger(__name__)
 
 class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -20,6 +36,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> OptionsFlowHandler:
+        """Get the options flow for this handler."""
+        return OptionsFlowHandler(config_entry)
+
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
@@ -38,9 +62,11 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
                 async with session.post(url, json=payload) as response:
                     if response.status == 200:
                         data = await response.json()
-                        # We don't need to store the token here, the coordinator will get a fresh one.
-                        # We just need to know it works.
                         if "access_token" in data:
+                             # Setup uses this token rather than logging in again
+                             async_get_hub(self.hass).async_hand_over_token(
+                                 user_input, data["access_token"], login_expiry(data)
+                             )
                              return self.async_create_entry(title=user_input[CONF_EMAIL], data=user_input)
                         else:
                              errors["base"] = "invalid_auth"
@@ -68,3 +94,76 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             ),
             errors=errors,
         )
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle PetTracer options."""
+
+    def __init__(self, config_entry: config_entries.ConfigEntry) -> None:
+        """Initialize options flow."""
+        self._config_entry = config_entry
+
+    async def async_step_init(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Manage the options."""
+        coordinator = self.hass.data.get(DOMAIN, {}).get(self._config_entry.entry_id)
+        if (
+            coordinator is not None
+            and coordinator.entry.entry_id != self._config_entry.entry_id
+        ):
+            # Entries of one account share a coordinator, which only follows
+            # the options of the entry it runs for
+            return self.async_abort(
+                reason="shared_account",
+                description_placeholders={"entry": coordinator.entry.title},
+            )
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            try:
+                polygon_fences(user_input.get(CONF_GEOFENCES))
+            except ValueError:
+                errors[CONF_GEOFENCES] = "invalid_geofences"
+            else:
+                return self.async_create_entry(title="", data=user_input)
+
+        options = user_input or self._config_entry.options
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema(
+                {
+                    vol.Optional(
+                        CONF_WS_COALESCE_WINDOW,
+                        default=options.get(
+                            CONF_WS_COALESCE_WINDOW, DEFAULT_WS_COALESCE_WINDOW
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=5,
+                            step=0.1,
+                            unit_of_measurement="s",
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_TRACE_SAMPLE_RATE,
+                        default=options.get(
+                            CONF_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SAMPLE_RATE
+                        ),
+                    ): selector.NumberSelector(
+                        selector.NumberSelectorConfig(
+                            min=0,
+                            max=1,
+                            step=0.01,
+                            mode=selector.NumberSelectorMode.BOX,
+                        )
+                    ),
+                    vol.Optional(
+                        CONF_GEOFENCES,
+                        default=options.get(CONF_GEOFENCES, {}),
+                    ): selector.ObjectSelector(),
+                }
+            ),
+            errors=errors,
+        )
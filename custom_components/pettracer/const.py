@@ -1,18 +1,64 @@
 """Constants for the PetTracer integration."""
+import os
 
 DOMAIN = "pettracer"
+
+# hass.data[DOMAIN] key of the hub sharing connections between entries
+DATA_HUB = "hub"
 CONF_API_KEY = "api_key"
 CONF_EMAIL = "email"
 CONF_PASSWORD = "password"
 UPDATE_INTERVAL_SECONDS = 60
+# REST polling only reconciles state while the WebSocket is delivering pushes
+RECONCILE_INTERVAL_SECONDS = 900
+# The WebSocket counts as silent when nothing arrived for this long
+WS_SILENCE_THRESHOLD_SECONDS = 120
+WS_HEALTH_CHECK_SECONDS = 30
+
+# Reasons for the current REST polling interval
+POLL_REASON_WS_HEALTHY = "websocket_healthy"
+POLL_REASON_WS_SILENT = "websocket_silent"
+POLL_REASON_WS_DISCONNECTED = "websocket_disconnected"
+
+# Options
+CONF_WS_COALESCE_WINDOW = "ws_coalesce_window"
+# Pushes arriving within this many seconds are merged into one update
+DEFAULT_WS_COALESCE_WINDOW = 0.5
+CONF_TRACE_SAMPLE_RATE = "trace_sample_rate"
+# Fraction of WebSocket frames kept for diagnostics, 0 disables tracing
+DEFAULT_TRACE_SAMPLE_RATE = 0
+# Custom polygons checked alongside the zones, as name: [[lat, lon], ...]
+CONF_GEOFENCES = "geofences"
+API_TIMEOUT_SECONDS = 30
+# Commands in flight at once across all devices
+MAX_CONCURRENT_COMMANDS = 4
+# Commands sent within this many seconds share one follow-up refresh
+COMMAND_REFRESH_DELAY_SECONDS = 2
+# Wait this long for a push confirming a command before fetching the device
+COMMAND_CONFIRM_TIMEOUT_SECONDS = 15
+# Renew tokens that carry an expiry this long before it
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+# Device snapshot saved for a quick startup, written at most this often
+SNAPSHOT_STORAGE_VERSION = 1
+SNAPSHOT_SAVE_DELAY_SECONDS = 60
+# Fired when a collar moves into or out of a zone or custom geofence
+EVENT_ZONE_ENTER = f"{DOMAIN}_zone_enter"
+EVENT_ZONE_LEAVE = f"{DOMAIN}_zone_leave"
+# Devices missing from this many refreshes in a row have their entities removed
+DEVICE_REMOVAL_REFRESHES = 3
+# How long a refresh waits for the homestation list once collars are in
+HOMESTATION_GRACE_SECONDS = 2
 
-API_BASE_URL = "https://portal.pettracer.com/api"
-API_WS_URL = "wss://pt.pettracer.com/sc"
+# Overridable so the integration can be pointed at scripts/fake_cloud.py
+API_BASE_URL = os.environ.get("PETTRACER_API_BASE_URL", "https://portal.pettracer.com/api")
+API_WS_URL = os.environ.get("PETTRACER_WS_URL", "wss://pt.pettracer.com/sc")
 API_ENDPOINT_LOGIN = "/user/login"
 API_ENDPOINT_IMAGE = "/image/"
 API_ENDPOINT_GET_CCS = "/map/getccs"
 API_ENDPOINT_GET_HOMESTATIONS = "/user/gethomestations"
 API_ENDPOINT_SET_MODE = "/map/setccmode"
+API_ENDPOINT_SET_LED = "/map/setccled"
+API_ENDPOINT_SET_BUZZER = "/map/setccbuz"
 
 # Modes mapping from collection.bru
 # Mode-Live: 11, Mode-Fast: 1, Mode-Normal: 2, Mode-Slow: 3, 
@@ -1,33 +1,83 @@
 """DataUpdateCoordinator for PetTracer."""
 from __future__ import annotations
 
+import asyncio
 import logging
+import time
+from collections import Counter
 from datetime import timedelta
+from typing import TYPE_CHECKING, Any, Callable, Coroutine, Iterable, NamedTuple
+
 import async_timeout
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+from homeassistant.helpers.event import (
+    TrackStates,
+    async_call_later,
+    async_track_state_change_filtered,
+    async_track_time_interval,
+)
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.debounce import Debouncer
+from homeassistant.helpers.entity import DeviceInfo
 
 from .const import (
     DOMAIN,
     UPDATE_INTERVAL_SECONDS,
+    RECONCILE_INTERVAL_SECONDS,
+    WS_SILENCE_THRESHOLD_SECONDS,
+    WS_HEALTH_CHECK_SECONDS,
+    POLL_REASON_WS_HEALTHY,
+    POLL_REASON_WS_SILENT,
+    POLL_REASON_WS_DISCONNECTED,
+    API_TIMEOUT_SECONDS,
+    MAX_CONCURRENT_COMMANDS,
+    COMMAND_REFRESH_DELAY_SECONDS,
+    COMMAND_CONFIRM_TIMEOUT_SECONDS,
+    HOMESTATION_GRACE_SECONDS,
+    DEVICE_REMOVAL_REFRESHES,
     API_BASE_URL,
     API_WS_URL,
     API_ENDPOINT_GET_CCS,
     API_ENDPOINT_GET_HOMESTATIONS,
     API_ENDPOINT_SET_MODE,
-    API_ENDPOINT_LOGIN,
+    API_ENDPOINT_SET_LED,
+    API_ENDPOINT_SET_BUZZER,
     CONF_API_KEY,
     CONF_EMAIL,
     CONF_PASSWORD,
+    CONF_WS_COALESCE_WINDOW,
+    DEFAULT_WS_COALESCE_WINDOW,
+    CONF_TRACE_SAMPLE_RATE,
+    DEFAULT_TRACE_SAMPLE_RATE,
+    CONF_GEOFENCES,
+    EVENT_ZONE_ENTER,
+    EVENT_ZONE_LEAVE,
+)
+from .auth import TokenManager
+from .battery import BATTERY_ESTIMATE, DrainEstimator
+from .geofence import (
+    ZONE_DOMAIN,
+    Fence,
+    GeofenceEngine,
+    polygon_fences,
+    zone_fences,
 )
+from .history import PositionHistory
+from .commands import PENDING_COMMANDS, CommandQueue, CommandTracker
+from .metrics import LatencyHistogram
+from .state import DeviceStateStore
+from .tracing import FrameTracer
 from .stomp_client import StompClient
 
+if TYPE_CHECKING:
+    from .hub import PetTracerHub
+
 _LOGGER = logging.getLogger(__name__)
 
 # Helper to ensure we have list of ints
@@ -40,6 +90,41 @@ def extract_device_ids(ids: list) -> list[int]:
              pass
     return res
 
+# Device fields the name and DeviceInfo are derived from
+METADATA_KEYS = frozenset(("details", "sw", "type"))
+
+
+class DeviceMeta(NamedTuple):
+    """Name and registry info of a device, shared by its entities."""
+
+    name: str
+    device_info: DeviceInfo
+
+
+def build_device_meta(dev_id: str, device: dict) -> DeviceMeta:
+    """Derive a device's name and DeviceInfo from its data."""
+    details = device.get("details") or {}
+    # Collars report type 0 or none at all, homestations type 1
+    if device.get("type", 0) == 1:
+        model = "HomeStation"
+        default_name = f"HomeStation {dev_id}"
+    else:
+        model = "GPS Collar"
+        default_name = f"Pet {dev_id}"
+    name = details.get("name") or default_name
+    return DeviceMeta(
+        name,
+        DeviceInfo(
+            identifiers={(DOMAIN, str(dev_id))},
+            name=name,
+            manufacturer="PetTracer",
+            model=model,
+            sw_version=device.get("sw"),
+            configuration_url="https://portal.pettracer.com/",
+        ),
+    )
+
+
 class PetTracerCoordinator(DataUpdateCoordinator):
     """Class to manage fetching PetTracer data."""
 
@@ -56,19 +141,86 @@ class PetTracerCoordinator(DataUpdateCoordinator):
         self.api_key = entry.data.get(CONF_API_KEY)
         self.email = entry.data.get(CONF_EMAIL)
         self.password = entry.data.get(CONF_PASSWORD)
-        
-        # If we have an API key, treat it as the access token initially
-        self.access_token = self.api_key
+
         self.session = async_get_clientsession(hass)
+        # If we have an API key, treat it as the access token initially
+        self.tokens = TokenManager(
+            hass, self.session, self.email, self.password, self.api_key
+        )
         self.ws_client: StompClient | None = None
+        # Set by the hub when the coordinator is shared between entries
+        self.hub: PetTracerHub | None = None
+        self.account: str | None = None
+        # Why update_interval currently has its value
+        self.poll_reason = POLL_REASON_WS_DISCONNECTED
+        self._ws_health_unsub: CALLBACK_TYPE | None = None
+        self.commands = CommandQueue(
+            hass,
+            self._async_send_command,
+            MAX_CONCURRENT_COMMANDS,
+            self._handle_command_sent,
+        )
+        self.command_tracker = CommandTracker(
+            hass, COMMAND_CONFIRM_TIMEOUT_SECONDS, self._handle_command_timeout
+        )
+        # Devices being fetched because a command went unconfirmed
+        self._confirming: set[str] = set()
+        self._command_refresh = Debouncer(
+            hass,
+            _LOGGER,
+            cooldown=COMMAND_REFRESH_DELAY_SECONDS,
+            immediate=False,
+            function=self.async_refresh,
+        )
+        self.tracer = FrameTracer()
+        # Zones and custom polygons collar positions are checked against
+        self.geofences = GeofenceEngine()
+        self._polygons: list[Fence] = []
+        self._zone_tracker = async_track_state_change_filtered(
+            hass, TrackStates(False, set(), {ZONE_DOMAIN}), self._async_update_fences
+        )
+        self.async_apply_options()
+        # Device state lives here, coordinator.data is the store's dict
+        self.store = DeviceStateStore()
+
+        # Last known homestations, kept when a refresh can't fetch them in time
+        self._homestations: dict[str, dict] = {}
+        self._homestation_task: asyncio.Task | None = None
+        # Fetches running outside a refresh, cancelled on shutdown
+        self._background_tasks: set[asyncio.Task] = set()
+        # Latency of the most recent request to each endpoint, in ms
+        self.endpoint_latency: dict[str, float] = {}
+        # Latency distribution of every request per endpoint
+        self.rest_latency: dict[str, LatencyHistogram] = {}
+        # Successful REST refreshes
+        self.update_count = 0
+        # Entity state writes per platform
+        self.state_writes: Counter[str] = Counter()
+
+        # WebSocket pushes waiting to be published, keyed by device ID
+        self._pending_ws: dict[str, dict] = {}
+        self._ws_flush_unsub: CALLBACK_TYPE | None = None
+        # received: pushes seen, coalesced: pushes folded into a pending one,
+        # published: coordinator updates issued for pushes
+        self.ws_stats = {"received": 0, "coalesced": 0, "published": 0}
+        # Per-device listeners, notified for pushes concerning that device only
+        self._device_listeners: dict[str, list[CALLBACK_TYPE]] = {}
+        # Listeners for devices appearing or disappearing, the devices they
+        # were last told about, and refreshes each missing device was absent
+        # from while it is kept
+        self._device_set_listeners: list[Callable[[set[str], set[str]], None]] = []
+        self._device_ids: set[str] = set()
+        self._missing_refreshes: dict[str, int] = {}
+        # Names and DeviceInfo per device, dropped when METADATA_KEYS change
+        self._device_meta: dict[str, DeviceMeta] = {}
+        # Battery drain per collar, fed from bat and chg as they change
+        self.battery = DrainEstimator()
+        # Recent positions per collar, fed from lastPos as it changes
+        self.positions = PositionHistory()
 
     async def start_websocket(self) -> None:
         """Start the WebSocket connection."""
         _LOGGER.debug("Initializing WebSocket connection")
-        if not self.access_token:
-            _LOGGER.warning("Cannot start WebSocket without access token")
-            return
-            
         if self.ws_client:
             _LOGGER.debug("Stopping existing WebSocket client")
             await self.ws_client.stop()
@@ -87,221 +239,671 @@ class PetTracerCoordinator(DataUpdateCoordinator):
         self.ws_client = StompClient(
             self.hass,
             API_WS_URL,
-            self.access_token,
+            self.tokens.access_token,
             extract_device_ids(device_ids),
-            self._handle_ws_message
+            self._handle_ws_message,
+            self._async_update_poll_interval,
+            self.session,
+            self.tokens,
+            self.tracer,
         )
         await self.ws_client.start()
 
+        if self._ws_health_unsub is None:
+            self._ws_health_unsub = async_track_time_interval(
+                self.hass,
+                self._async_update_poll_interval,
+                timedelta(seconds=WS_HEALTH_CHECK_SECONDS),
+            )
+
     async def stop_websocket(self) -> None:
         """Stop the WebSocket connection."""
         if self.ws_client:
             await self.ws_client.stop()
             self.ws_client = None
+        self._cancel_ws_flush()
+        if self._ws_health_unsub is not None:
+            self._ws_health_unsub()
+            self._ws_health_unsub = None
+        self._async_update_poll_interval()
+
+    @callback
+    def _async_update_poll_interval(self, _now=None) -> None:
+        """Stretch REST polling while the WebSocket delivers pushes."""
+        client = self.ws_client
+        if client is None or not client.connected:
+            reason = POLL_REASON_WS_DISCONNECTED
+        elif (
+            client.last_message is None
+            or time.monotonic() - client.last_message > WS_SILENCE_THRESHOLD_SECONDS
+        ):
+            reason = POLL_REASON_WS_SILENT
+        else:
+            reason = POLL_REASON_WS_HEALTHY
+
+        if reason == self.poll_reason:
+            return
+
+        interval = timedelta(
+            seconds=RECONCILE_INTERVAL_SECONDS
+            if reason == POLL_REASON_WS_HEALTHY
+            else UPDATE_INTERVAL_SECONDS
+        )
+        _LOGGER.debug(
+            "REST polling interval now %s (%s, was %s)",
+            interval,
+            reason,
+            self.poll_reason,
+        )
+        speed_up = self.update_interval is not None and interval < self.update_interval
+        self.poll_reason = reason
+        self.update_interval = interval
+
+        # Catch up straight away rather than waiting out the long interval;
+        # the refresh reschedules polling at the new cadence
+        if speed_up and self.ws_client is not None:
+            self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def async_add_device_listener(
+        self, dev_id: str, update_callback: CALLBACK_TYPE
+    ) -> Callable[[], None]:
+        """Listen for updates to a single device."""
+        listeners = self._device_listeners.setdefault(dev_id, [])
+        listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove update listener."""
+            listeners.remove(update_callback)
+            if not listeners and self._device_listeners.get(dev_id) is listeners:
+                del self._device_listeners[dev_id]
+
+        return remove_listener
+
+    @callback
+    def async_add_device_set_listener(
+        self, update_callback: Callable[[set[str], set[str]], None]
+    ) -> Callable[[], None]:
+        """Listen for devices being added to or removed from the account.
 
+        The callback gets the added and the removed device IDs.
+        """
+        self._device_set_listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove update listener."""
+            self._device_set_listeners.remove(update_callback)
+
+        return remove_listener
+
+    def _keep_missing_devices(self, devices: dict[str, dict]) -> None:
+        """Carry known devices a refresh left out over into its results.
+
+        A device only counts as removed once it is missing from several
+        refreshes in a row, so one bad response neither retires it nor
+        wipes its state, history and estimates in the meantime.
+        """
+        for dev_id in devices.keys() & self._missing_refreshes.keys():
+            del self._missing_refreshes[dev_id]
+        for dev_id, device in self.store.data.items():
+            if dev_id in devices:
+                continue
+            missed = self._missing_refreshes.get(dev_id, 0) + 1
+            if missed < DEVICE_REMOVAL_REFRESHES:
+                self._missing_refreshes[dev_id] = missed
+                devices[dev_id] = device
+            else:
+                self._missing_refreshes.pop(dev_id, None)
+
+    @callback
+    def _async_update_device_set(self) -> None:
+        """Tell device set listeners about devices that came or went."""
+        current = self.store.data.keys()
+        added = current - self._device_ids
+        removed = self._device_ids - current
+        if not added and not removed:
+            return
+
+        _LOGGER.debug("Devices added: %s, removed: %s", added, removed)
+        self._device_ids.update(added)
+        self._device_ids.difference_update(removed)
+        for update_callback in list(self._device_set_listeners):
+            update_callback(added, removed)
+
+    @callback
+    def async_update_device_listeners(self, dev_ids: Iterable[str]) -> None:
+        """Notify the listeners of the given devices."""
+        for dev_id in dev_ids:
+            for update_callback in list(self._device_listeners.get(dev_id, ())):
+                update_callback()
+
+    def device_meta(self, dev_id: str) -> DeviceMeta:
+        """Return the name and DeviceInfo of a device."""
+        meta = self._device_meta.get(dev_id)
+        if meta is None:
+            device = self.store.data.get(dev_id)
+            meta = build_device_meta(dev_id, device or {})
+            if device is not None:
+                self._device_meta[dev_id] = meta
+        return meta
+
+    def _update_device(self, dev_id: str, fields: dict) -> bool:
+        """Merge fields into a device's state, returning whether it changed."""
+        if not self.store.update(dev_id, fields):
+            return False
+        if not METADATA_KEYS.isdisjoint(fields):
+            self._device_meta.pop(dev_id, None)
+        if "bat" in fields or "chg" in fields:
+            self._record_battery(dev_id)
+        if "lastPos" in fields:
+            self._record_position(dev_id)
+        return True
+
+    def _replace_devices(self, devices: dict[str, dict]) -> set[str]:
+        """Load a full snapshot of device states, returning those that changed."""
+        for dev_id in list(self._device_meta):
+            device = devices.get(dev_id)
+            current = self.store.data.get(dev_id, {})
+            if device is None or any(
+                device.get(key) != current.get(key) for key in METADATA_KEYS
+            ):
+                del self._device_meta[dev_id]
+        changed = self.store.replace(devices)
+        for dev_id in changed:
+            if dev_id in self.store.data:
+                self._record_battery(dev_id)
+                self._record_position(dev_id)
+            else:
+                self.battery.remove(dev_id)
+                self.positions.remove(dev_id)
+                self.geofences.remove(dev_id)
+        return changed
+
+    def _record_battery(self, dev_id: str) -> None:
+        """Feed a device's battery reading to the drain estimate."""
+        device = self.store.data[dev_id]
+        before = self.battery.rate(dev_id), self.battery.hours_left(dev_id)
+        self.battery.record(dev_id, device.get("bat"), device.get("chg"))
+        # The estimate can move without bat changing, e.g. a flat reading
+        if (self.battery.rate(dev_id), self.battery.hours_left(dev_id)) != before:
+            self.store.touch(dev_id, BATTERY_ESTIMATE)
+
+    def _record_position(self, dev_id: str) -> None:
+        """Add a device's last fix to its history and check it against the fences."""
+        if not self.positions.record(dev_id, self.store.data[dev_id]):
+            return
+        point = self.positions.last(dev_id, 1)[0]
+        entered, left = self.geofences.update(dev_id, point.latitude, point.longitude)
+        if not entered and not left:
+            return
+        name = self.device_meta(dev_id).name
+        for event_type, fence_ids in ((EVENT_ZONE_LEAVE, left), (EVENT_ZONE_ENTER, entered)):
+            for fence_id in fence_ids:
+                fence = self.geofences.fence(fence_id)
+                self.hass.bus.async_fire(
+                    event_type,
+                    {
+                        "device": dev_id,
+                        "name": name,
+                        "zone": fence_id,
+                        "zone_name": fence.name if fence is not None else fence_id,
+                        "latitude": point.latitude,
+                        "longitude": point.longitude,
+                    },
+                )
+
+    @callback
+    def _async_update_fences(self, event: Any = None) -> None:
+        """Rebuild the geofence index from the zones and custom polygons."""
+        self.geofences.set_fences([*zone_fences(self.hass), *self._polygons])
+
+    @callback
+    def async_restore(self, devices: dict[str, dict]) -> None:
+        """Start from a saved snapshot instead of a first refresh."""
+        self._replace_devices(devices)
+        self.data = self.store.data
+        self._device_ids.update(self.store.data)
+
+    @callback
+    def async_snapshot(self) -> dict[str, Any]:
+        """Return the device states to save for the next startup."""
+        # Copied, the store writes it out while updates keep coming in
+        return {
+            "devices": {
+                dev_id: dict(device) for dev_id, device in self.store.data.items()
+            }
+        }
+
+    @property
+    def pending_push_count(self) -> int:
+        """Return the number of devices with batched pushes to publish."""
+        return len(self._pending_ws)
+
+    @callback
+    def async_apply_options(self) -> None:
+        """Apply options that are not read on every use."""
+        self.tracer.configure(
+            float(self.entry.options.get(CONF_TRACE_SAMPLE_RATE, DEFAULT_TRACE_SAMPLE_RATE))
+        )
+        try:
+            self._polygons = polygon_fences(self.entry.options.get(CONF_GEOFENCES))
+        except ValueError as err:
+            _LOGGER.warning("Ignoring custom geofences: %s", err)
+            self._polygons = []
+        self._async_update_fences()
+
+    @property
+    def ws_coalesce_window(self) -> float:
+        """Return the window in seconds used to batch WebSocket pushes."""
+        return float(
+            self.entry.options.get(CONF_WS_COALESCE_WINDOW, DEFAULT_WS_COALESCE_WINDOW)
+        )
+
+    def receives_pushes_for(self, dev_id: str) -> bool:
+        """Return whether our own WebSocket delivers pushes for a device."""
+        client = self.ws_client
+        return (
+            client is not None
+            and client.connected
+            and int(dev_id) in client.device_ids
+        )
+
+    @callback
     def _handle_ws_message(self, data: dict) -> None:
         """Handle incoming WebSocket message."""
-        _LOGGER.debug("Received WebSocket message: %s", data)
-        
-        dev_id = str(data.get("id"))
-        if not dev_id:
+        if data.get("id") is None:
             return
+        self.async_handle_push(data)
+        if self.hub is not None:
+            self.hub.async_route_push(self, data)
 
-        if self.data is None:
-            self.data = {}
-        
-        # Important: Create a shallow copy of the data to ensure listeners are notified
-        # modifying the dict in place might not trigger updates if reference is same
-        new_data = self.data.copy()
-        
-        if dev_id in new_data:
-            # We also copy the device dict to be safe, though not strictly required if we replaced the top level
-            device_data = new_data[dev_id].copy()
-            device_data.update(data)
-            new_data[dev_id] = device_data
+    @callback
+    def async_handle_push(self, data: dict) -> None:
+        """Batch a device update pushed over a WebSocket."""
+        dev_id = data.get("id")
+        if dev_id is None:
+            return
+        dev_id = str(dev_id)
+
+        self.ws_stats["received"] += 1
+
+        # Merge into any update still waiting for this device, latest field wins
+        pending = self._pending_ws.get(dev_id)
+        if pending is None:
+            self._pending_ws[dev_id] = data
         else:
-            new_data[dev_id] = data
-            
-        self.async_set_updated_data(new_data)
+            pending.update(data)
+            self.ws_stats["coalesced"] += 1
 
-    async def _ensure_token(self):
-        """Ensure we have an access token."""
-        if self.access_token:
+        if self._ws_flush_unsub is not None:
             return
 
-        if not self.email or not self.password:
-            raise UpdateFailed("No credentials available for PetTracer")
+        window = self.ws_coalesce_window
+        if window <= 0:
+            self._flush_ws_updates()
+        else:
+            self._ws_flush_unsub = async_call_later(
+                self.hass, window, self._flush_ws_updates
+            )
 
-        try:
-            url = f"{API_BASE_URL}{API_ENDPOINT_LOGIN}"
-            payload = {
-                "login": self.email,
-                "password": self.password,
-            }
-            async with self.session.post(url, json=payload) as response:
-                response.raise_for_status()
-                data = await response.json()
-                self.access_token = data.get("access_token")
-                if not self.access_token:
-                    raise UpdateFailed("Login successful but no access token found")
-        except Exception as err:
-            raise UpdateFailed(f"Login failed: {err}")
+    @callback
+    def _flush_ws_updates(self, _now=None) -> None:
+        """Publish all batched WebSocket updates as one coordinator update."""
+        if self._ws_flush_unsub is not None:
+            # Cancel the timer in case we are flushing ahead of it
+            self._ws_flush_unsub()
+            self._ws_flush_unsub = None
+        if not self._pending_ws:
+            return
+
+        pending, self._pending_ws = self._pending_ws, {}
+
+        if self.data is None:
+            self.data = self.store.data
+
+        changed = []
+        unknown = False
+        applied = False
+        for dev_id, update in pending.items():
+            if dev_id not in self.store.data:
+                # Half a device would get the wrong entities, fetch it whole
+                unknown = True
+                continue
+            applied = True
+            confirmed = self.command_tracker.process(dev_id, update)
+            # A confirmed command changes the entity even if the value doesn't
+            if self._update_device(dev_id, update) or confirmed:
+                if confirmed:
+                    self.store.touch(dev_id, PENDING_COMMANDS)
+                changed.append(dev_id)
+
+        self.ws_stats["published"] += 1
+        if applied and not self.last_update_success:
+            # Live pushes mean the data is current again even if the last
+            # poll failed, every entity has to learn it is available
+            self.last_update_success = True
+            self.async_update_listeners()
+        else:
+            # Only the entities of the changed devices are notified
+            self.async_update_device_listeners(changed)
+        if unknown:
+            self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def _async_create_background_task(
+        self, target: Coroutine[Any, Any, Any], name: str
+    ) -> asyncio.Task:
+        """Start a task that async_shutdown cancels if it is still running."""
+        task = self.hass.async_create_background_task(target, name)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _cancel_ws_flush(self) -> None:
+        """Drop any batched WebSocket updates."""
+        if self._ws_flush_unsub is not None:
+            self._ws_flush_unsub()
+            self._ws_flush_unsub = None
+        self._pending_ws.clear()
+
+    async def async_shutdown(self) -> None:
+        """Stop polling, the WebSocket, queued commands and token refreshes.
+
+        Home Assistant also calls this when the entry that created the
+        coordinator unloads; it keeps running while other entries share it.
+        """
+        if self._shutdown_requested or (
+            self.hub is not None and self.hub.entry_count(self)
+        ):
+            return
+        await super().async_shutdown()
+        await self.stop_websocket()
+        await self.commands.async_shutdown()
+        await self._command_refresh.async_shutdown()
+        self.command_tracker.async_shutdown()
+        self.tokens.async_shutdown()
+        self._zone_tracker.async_remove()
+        for task in list(self._background_tasks):
+            task.cancel()
 
     async def _async_update_data(self):
         """Fetch data from API endpoint."""
         # Wrap the update logic to handle 401 retry
         try:
-            return await self._fetch_data()
+            data = await self._fetch_data()
         except UpdateFailed as err:
             # If it looks like an auth error? 
             # Depending on how raise_for_status raises errors (ClientResponseError with status)
             # We can catch 401 specifically.
             if "401" in str(err):
-                # Clear token and retry once
-                self.access_token = None
-                return await self._fetch_data()
-            raise err
+                # The rejected token was dropped, retry once with a new one
+                data = await self._fetch_data()
+            else:
+                raise err
         except Exception as err:
              raise UpdateFailed(f"Error communicating with API: {err}")
+        self.update_count += 1
+        self._async_update_device_set()
+        if self.ws_client is not None:
+            # Follow collars being added to or removed from the account
+            await self.ws_client.async_set_devices(extract_device_ids(data))
+        return data
 
     async def _fetch_data(self):
         """Internal fetch data logic."""
-        await self._ensure_token()
-        
-        try:
-            async with async_timeout.timeout(30):
-                headers = {
-                    "Authorization": f"Bearer {self.access_token}",
-                    "Content-Type": "application/json",
-                }
-                
-                # Fetch list of collars
-                url = f"{API_BASE_URL}{API_ENDPOINT_GET_CCS}"
-                async with self.session.get(url, headers=headers) as response:
-                    if response.status == 401:
-                        raise UpdateFailed("401 Unauthorized")
-                    response.raise_for_status()
-                    data = await response.json()
-                    
-                    # Convert list to dict keyed by ID for easier access
-                    results = {}
-                    if isinstance(data, list):
-                        for device in data:
-                            dev_id = device.get("id")
-                            if not dev_id:
-                                continue
-                            
-                            dev_id = str(dev_id)
-                            # Flag as collar type if not present or explicitly set
-                            if "type" not in device:
-                                device["type"] = 0
-                            results[dev_id] = device
-
-                # Fetch list of homestations
-                url = f"{API_BASE_URL}{API_ENDPOINT_GET_HOMESTATIONS}"
-                async with self.session.get(url, headers=headers) as response:
-                    if response.status == 401:
-                         # If collars worked, this should work, but handle gracefully
-                        _LOGGER.warning("401 Unauthorized fetching homestations")
-                    elif response.status == 200:
-                        data = await response.json()
-                        if isinstance(data, list):
-                            for device in data:
-                                dev_id = device.get("id")
-                                if not dev_id:
-                                    continue
-                                
-                                dev_id = str(dev_id)
-                                # Homestations usually type 1
-                                results[dev_id] = device
-                    else:
-                         _LOGGER.warning("Error fetching homestations: %s", response.status)
-                    
-                    return results
+        access_token = await self.tokens.async_get_token()
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json",
+        }
 
+        # Issue both requests at once. The homestation list is secondary: it
+        # must never hold back or void fresh collar data, so it runs as its own
+        # task and may still be in flight from a previous refresh.
+        started = self._homestation_task is None or self._homestation_task.done()
+        if started:
+            self._homestation_task = self._async_create_background_task(
+                self._fetch_homestations(headers), "pettracer homestations"
+            )
+        homestation_task = self._homestation_task
+
+        try:
+            async with async_timeout.timeout(API_TIMEOUT_SECONDS):
+                results = await self._fetch_collars(headers)
         except Exception as err:
             raise UpdateFailed(f"Error communicating with API: {err}")
 
-    async def set_collar_mode(self, dev_id: str, mode_cmd: int):
-        """Set the tracking mode for a collar."""
-        # Try once
+        done, _ = await asyncio.wait(
+            {homestation_task}, timeout=HOMESTATION_GRACE_SECONDS
+        )
+        if done:
+            self._store_homestations(homestation_task)
+        else:
+            _LOGGER.debug(
+                "Homestations still pending after %ss, using cached list",
+                HOMESTATION_GRACE_SECONDS,
+            )
+            if started:
+                homestation_task.add_done_callback(self._handle_late_homestations)
+
+        # Homestations usually type 1
+        for dev_id, device in self._homestations.items():
+            results.setdefault(dev_id, device)
+
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Refresh timings: %s",
+                ", ".join(f"{k}={v:.0f}ms" for k, v in self.endpoint_latency.items()),
+            )
+        confirmed = [
+            dev_id for dev_id, device in results.items()
+            if self.command_tracker.process(dev_id, device)
+        ]
+        self._keep_missing_devices(results)
+        self._replace_devices(results)
+        for dev_id in confirmed:
+            self.store.touch(dev_id, PENDING_COMMANDS)
+        return self.store.data
+
+    async def _async_get(self, endpoint: str, headers: dict) -> tuple[int, Any]:
+        """GET an API endpoint, recording its latency."""
+        url = f"{API_BASE_URL}{endpoint}"
+        start = time.monotonic()
+        try:
+            async with self.session.get(url, headers=headers) as response:
+                if response.status != 200:
+                    return response.status, None
+                return response.status, await response.json()
+        finally:
+            self._record_latency(endpoint, (time.monotonic() - start) * 1000)
+
+    def _record_latency(self, endpoint: str, latency: float) -> None:
+        """Record the latency of a request, in ms."""
+        self.endpoint_latency[endpoint] = latency
+        histogram = self.rest_latency.get(endpoint)
+        if histogram is None:
+            histogram = self.rest_latency[endpoint] = LatencyHistogram()
+        histogram.record(latency)
+
+    async def _fetch_collars(self, headers: dict) -> dict[str, dict]:
+        """Fetch the list of collars keyed by ID."""
+        status, data = await self._async_get(API_ENDPOINT_GET_CCS, headers)
+        if status == 401:
+            self.tokens.async_invalidate(
+                headers["Authorization"].removeprefix("Bearer ")
+            )
+            raise UpdateFailed("401 Unauthorized")
+        if status != 200:
+            raise UpdateFailed(f"Error fetching collars: {status}")
+
+        # Convert list to dict keyed by ID for easier access
+        results = {}
+        if isinstance(data, list):
+            for device in data:
+                dev_id = device.get("id")
+                if not dev_id:
+                    continue
+
+                # Flag as collar type if not present or explicitly set
+                if "type" not in device:
+                    device["type"] = 0
+                results[str(dev_id)] = device
+        return results
+
+    async def _fetch_homestations(self, headers: dict) -> dict[str, dict] | None:
+        """Fetch the list of homestations keyed by ID, None on failure."""
         try:
-            await self._set_collar_mode_request(dev_id, mode_cmd)
+            async with async_timeout.timeout(API_TIMEOUT_SECONDS):
+                status, data = await self._async_get(
+                    API_ENDPOINT_GET_HOMESTATIONS, headers
+                )
         except Exception as err:
-            if "401" in str(err):
-                self.access_token = None
-                await self._set_collar_mode_request(dev_id, mode_cmd)
-            else:
-                raise err
-        
-        # Trigger an immediate refresh/update
-        await self.async_request_refresh()
-
-    async def _set_collar_mode_request(self, dev_id: str, mode_cmd: int):
-        await self._ensure_token()
-        
-        url = f"{API_BASE_URL}{API_ENDPOINT_SET_MODE}"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json",
-        }
-        payload = {
-            "devType": 0,
-            "devId": int(dev_id),
-            "cmdNr": mode_cmd
-        }
-        
-        async with self.session.post(url, headers=headers, json=payload) as response:
-            if response.status == 401:
-                raise Exception("401 Unauthorized")
-            response.raise_for_status()
+            _LOGGER.warning("Error fetching homestations: %s", err)
+            return None
+
+        if status == 401:
+            # If collars worked, this should work, but handle gracefully
+            _LOGGER.warning("401 Unauthorized fetching homestations")
+            return None
+        if status != 200:
+            _LOGGER.warning("Error fetching homestations: %s", status)
+            return None
+
+        results = {}
+        if isinstance(data, list):
+            for device in data:
+                dev_id = device.get("id")
+                if dev_id:
+                    results[str(dev_id)] = device
+        return results
+
+    def _store_homestations(self, task: asyncio.Task) -> bool:
+        """Cache a finished homestation fetch, keeping the old list on failure."""
+        if task.cancelled():
+            return False
+        homestations = task.result()
+        if homestations is None:
+            return False
+        self._homestations = homestations
+        return True
+
+    def _handle_late_homestations(self, task: asyncio.Task) -> None:
+        """Merge a homestation list that arrived after its refresh completed."""
+        if (
+            self._shutdown_requested
+            or not self._store_homestations(task)
+            or self.data is None
+        ):
+            return
+        _LOGGER.debug(
+            "Late homestation list merged after %.0fms",
+            self.endpoint_latency.get(API_ENDPOINT_GET_HOMESTATIONS, 0),
+        )
+        changed = [
+            dev_id for dev_id, device in self._homestations.items()
+            if self._update_device(dev_id, device)
+        ]
+        self.async_update_device_listeners(changed)
+        self._async_update_device_set()
+
+    async def set_collar_mode(self, dev_id: str, mode_cmd: int):
+        """Set the tracking mode for a collar."""
+        await self._async_command(dev_id, "mode", mode_cmd)
 
     async def set_led(self, dev_id: str, turn_on: bool):
         """Set the collar LED state."""
         # 1 = On, 2 = Off
-        state_cmd = 1 if turn_on else 2
-        await self._set_led_request(dev_id, state_cmd)
-        await self.async_request_refresh()
-
-    async def _set_led_request(self, dev_id: str, state_cmd: int):
-        await self._ensure_token()
-        # /api/map/setccled/{collarId}/{1/0} - user specified 1/2 in request text
-        url = f"{API_BASE_URL}/map/setccled/{dev_id}/{state_cmd}"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-        }
-        
-        async with self.session.post(url, headers=headers) as response:
-            if response.status == 401:
-                self.access_token = None
-                await self._ensure_token()
-                headers["Authorization"] = f"Bearer {self.access_token}"
-                async with self.session.post(url, headers=headers) as retry_resp:
-                    retry_resp.raise_for_status()
-            else:
-                response.raise_for_status()
+        await self._async_command(dev_id, "led", 1 if turn_on else 2)
 
     async def set_buzzer(self, dev_id: str, turn_on: bool):
         """Set the collar buzzer state."""
         # 1 = On, 2 = Off
-        state_cmd = 1 if turn_on else 2
-        await self._set_buzzer_request(dev_id, state_cmd)
-        await self.async_request_refresh()
-
-    async def _set_buzzer_request(self, dev_id: str, state_cmd: int):
-        await self._ensure_token()
-        # /api/map/setccbuz/{collarId}/{1/0} - user specified 1/2 in request text
-        url = f"{API_BASE_URL}/map/setccbuz/{dev_id}/{state_cmd}"
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-        }
-        
-        async with self.session.post(url, headers=headers) as response:
-            if response.status == 401:
-                self.access_token = None
-                await self._ensure_token()
-                headers["Authorization"] = f"Bearer {self.access_token}"
-                async with self.session.post(url, headers=headers) as retry_resp:
-                    retry_resp.raise_for_status()
-            else:
+        await self._async_command(dev_id, "buz", 1 if turn_on else 2)
+
+    async def _async_command(self, dev_id: str, actuator: str, value: int) -> None:
+        """Queue a command and keep it pending until a push confirms it."""
+        self.command_tracker.track(dev_id, actuator, value)
+        self._async_touch_device(dev_id)
+        try:
+            await self.commands.async_submit(dev_id, actuator, value)
+        except Exception:
+            # A newer command for the actuator may have replaced this one
+            self.command_tracker.discard(dev_id, actuator, value)
+            self._async_touch_device(dev_id)
+            raise
+
+    @callback
+    def _async_touch_device(self, dev_id: str) -> None:
+        """Notify a device's entities that its pending commands changed."""
+        self.store.touch(dev_id, PENDING_COMMANDS)
+        self.async_update_device_listeners((dev_id,))
+
+    async def _async_send_command(self, dev_id: str, actuator: str, value: int) -> None:
+        """Send a queued command to the API."""
+        if actuator == "mode":
+            payload = {
+                "devType": 0,
+                "devId": int(dev_id),
+                "cmdNr": value
+            }
+            await self._async_post_command(API_ENDPOINT_SET_MODE, payload)
+        else:
+            # /api/map/setccled/{collarId}/{1/2} and /api/map/setccbuz/{collarId}/{1/2}
+            endpoint = API_ENDPOINT_SET_LED if actuator == "led" else API_ENDPOINT_SET_BUZZER
+            await self._async_post_command(endpoint, path=f"/{dev_id}/{value}")
+
+    @callback
+    def _handle_command_sent(self, dev_id: str, actuator: str, value: int) -> None:
+        """Fall back to polling for confirmation when there are no pushes."""
+        if self.ws_client is None or not self.ws_client.connected:
+            self.hass.async_create_task(self._command_refresh.async_call())
+
+    @callback
+    def _handle_command_timeout(self, dev_id: str) -> None:
+        """Fetch a device whose command no push confirmed in time."""
+        if dev_id not in self._confirming:
+            self._confirming.add(dev_id)
+            self._async_create_background_task(
+                self._async_confirm_by_poll(dev_id), f"pettracer confirm {dev_id}"
+            )
+
+    async def _async_confirm_by_poll(self, dev_id: str) -> None:
+        """Update one device from the collar list and settle its commands."""
+        try:
+            access_token = await self.tokens.async_get_token()
+            async with async_timeout.timeout(API_TIMEOUT_SECONDS):
+                collars = await self._fetch_collars(
+                    {"Authorization": f"Bearer {access_token}"}
+                )
+            device = collars.get(dev_id)
+            if device is not None:
+                self._update_device(dev_id, device)
+                self.command_tracker.process(dev_id, device)
+        except Exception as err:
+            _LOGGER.warning("Error fetching %s to confirm command: %s", dev_id, err)
+        finally:
+            self._confirming.discard(dev_id)
+        # Commands past their timeout did not take effect, show reported state
+        self.command_tracker.expire(dev_id)
+        self._async_touch_device(dev_id)
+
+    async def _async_post_command(
+        self, endpoint: str, payload: dict | None = None, path: str = ""
+    ) -> None:
+        """POST a command, logging in again once if the token is rejected."""
+        url = f"{API_BASE_URL}{endpoint}{path}"
+        for attempt in range(2):
+            access_token = await self.tokens.async_get_token()
+            headers = {
+                "Authorization": f"Bearer {access_token}",
+            }
+            start = time.monotonic()
+            async with self.session.post(url, headers=headers, json=payload) as response:
+                self._record_latency(endpoint, (time.monotonic() - start) * 1000)
+                if response.status == 401 and attempt == 0:
+                    self.tokens.async_invalidate(access_token)
+                    continue
                 response.raise_for_status()
+                return
@@ -7,11 +7,11 @@ from homeassistant.components.device_tracker import SourceType, TrackerEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.helpers.entity import DeviceInfo
 
+from .battery import battery_percent
 from .const import DOMAIN, API_BASE_URL, API_ENDPOINT_IMAGE
 from .coordinator import PetTracerCoordinator
+from .entity import PetTracerEntity, async_add_device_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -22,67 +22,32 @@ async def async_setup_entry(
 ) -> None:
     """Set up PetTracer device trackers."""
     coordinator: PetTracerCoordinator = hass.data[DOMAIN][entry.entry_id]
-    
-    entities = []
-    for dev_id, device_data in coordinator.data.items():
-        entities.append(PetTracerTracker(coordinator, dev_id))
-    
-    async_add_entities(entities)
-
-class PetTracerTracker(CoordinatorEntity, TrackerEntity):
+    async_add_device_entities(coordinator, entry, async_add_entities, _device_entities)
+
+
+def _device_entities(
+    coordinator: PetTracerCoordinator, dev_id: str, device_data: dict
+) -> list[PetTracerTracker]:
+    """Return the trackers of a device."""
+    return [PetTracerTracker(coordinator, dev_id)]
+
+class PetTracerTracker(PetTracerEntity, TrackerEntity):
     """Representation of a PetTracer device."""
 
     def __init__(self, coordinator: PetTracerCoordinator, dev_id: str) -> None:
         """Initialize the tracker."""
-        super().__init__(coordinator)
-        self._dev_id = dev_id
+        super().__init__(coordinator, dev_id)
         
     @property
     def unique_id(self) -> str:
         """Return the unique ID."""
         return f"{self._dev_id}_tracker"
 
-    @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        details = self.check_details.get("details", {})
-        
-        # Determine model/name based on type
-        # Collars typically don't have explicit type in their nested details but root has type=0
-        # Homestations have type=1
-        dev_type = self.check_details.get("type", 0)
-        
-        if dev_type == 1:
-            default_name = f"HomeStation {self._dev_id}"
-            model = "HomeStation"
-            name = details.get("name") or default_name
-        else:
-            default_name = f"Pet {self._dev_id}"
-            model = "GPS Collar"
-            name = details.get("name") or default_name
-
-        return DeviceInfo(
-            identifiers={(DOMAIN, str(self._dev_id))},
-            name=name,
-            manufacturer="PetTracer",
-            model=model,
-            sw_version=self.check_details.get("sw"),
-            configuration_url="https://portal.pettracer.com/",
-        )
-
     @property
     def check_details(self) -> dict:
         """Return the device data from coordinator."""
         return self.coordinator.data.get(self._dev_id, {})
 
-    @property
-    def name(self) -> str:
-        """Return the name of the device."""
-        details = self.check_details.get("details", {})
-        dev_type = self.check_details.get("type", 0)
-        default_name = f"HomeStation {self._dev_id}" if dev_type == 1 else f"Pet {self._dev_id}"
-        return details.get("name") or default_name
-
     @property
     def latitude(self) -> float | None:
         """Return latitude value of the device."""
@@ -111,30 +76,7 @@ class PetTracerTracker(CoordinatorEntity, TrackerEntity):
     def battery_level(self) -> int | None:
         """Return the battery level of the device."""
         # 'bat' seems to be in mV (e.g., 4141).
-        val = self.check_details.get("bat")
-        if val is not None:
-            try:
-                mv = int(val)
-                e = max(3000, min(mv, 4150))
-                
-                t = 0
-                if e >= 4000:
-                    t = (e - 4000) / 150 * 17 + 83
-                elif e >= 3900:
-                    t = (e - 3900) / 100 * 16 + 67
-                elif e >= 3840:
-                    t = (e - 3840) / 60 * 17 + 50
-                elif e >= 3760:
-                    t = (e - 3760) / 80 * 16 + 34
-                elif e >= 3600:
-                    t = (e - 3600) / 160 * 17 + 17
-                else:
-                    t = 0
-                
-                return round(t)
-            except (ValueError, TypeError):
-                pass
-        return None
+        return battery_percent(self.check_details.get("bat"))
 
     @property
     def source_type(self) -> str:
@@ -0,0 +1,103 @@
+"""Diagnostics support for PetTracer."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import DOMAIN, CONF_API_KEY, CONF_EMAIL, CONF_GEOFENCES, CONF_PASSWORD
+from .coordinator import PetTracerCoordinator
+from .hub import async_get_hub
+
+TO_REDACT = {
+    CONF_API_KEY,
+    CONF_EMAIL,
+    CONF_PASSWORD,
+    # Custom polygons give away places like home as precisely as positions
+    CONF_GEOFENCES,
+    "access_token",
+    "posLat",
+    "posLong",
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: PetTracerCoordinator = hass.data[DOMAIN][entry.entry_id]
+    ws_client = coordinator.ws_client
+    tracker = coordinator.command_tracker
+    hub = async_get_hub(hass)
+
+    websocket = None
+    if ws_client is not None:
+        websocket = {
+            "connected": ws_client.connected,
+            "reconnects": ws_client.reconnect_count,
+            "disconnected_seconds": round(ws_client.disconnected_seconds, 1),
+            "last_connect_ms": ws_client.last_connect_duration,
+            "subscribed_devices": len(ws_client.device_ids),
+            "subscription_updates": ws_client.subscription_updates,
+            **ws_client.stats,
+            "sockjs_frames": dict(ws_client.sockjs_frames),
+            "stomp_frames": dict(ws_client.stomp_frames),
+        }
+
+    return {
+        "entry": {
+            "data": async_redact_data(entry.data, TO_REDACT),
+            "options": async_redact_data(entry.options, TO_REDACT),
+        },
+        "coordinator": {
+            "last_update_success": coordinator.last_update_success,
+            "shared_by_entries": hub.entry_count(coordinator),
+            "update_interval": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+            "poll_reason": coordinator.poll_reason,
+            "update_count": coordinator.update_count,
+            "state_version": coordinator.store.version,
+            "position_points": coordinator.positions.point_count,
+            "geofences": coordinator.geofences.fence_count,
+            "devices": async_redact_data(coordinator.data or {}, TO_REDACT),
+        },
+        "hub": {
+            "accounts": hub.account_count,
+            "routed_pushes": hub.routed_pushes,
+        },
+        "rest": {
+            "logins": coordinator.tokens.login_count,
+            "latency": {
+                endpoint: histogram.as_dict()
+                for endpoint, histogram in coordinator.rest_latency.items()
+            },
+        },
+        "websocket": websocket,
+        "pushes": dict(coordinator.ws_stats),
+        "commands": {
+            "confirmed": tracker.confirmed,
+            "timed_out": tracker.timed_out,
+            "superseded": coordinator.commands.superseded,
+            "latency_ms": {
+                actuator: {
+                    "count": len(samples),
+                    "mean": round(sum(samples) / len(samples), 1),
+                    "max": round(max(samples), 1),
+                }
+                for actuator, samples in tracker.latency.items()
+                if samples
+            },
+        },
+        "state_writes": dict(coordinator.state_writes),
+        "queues": {
+            "pending_pushes": coordinator.pending_push_count,
+            "commands": coordinator.commands.depth,
+            "unconfirmed_commands": tracker.depth,
+            "stomp_buffer": ws_client.buffered if ws_client else 0,
+        },
+        # Raw frames, only collected while tracing is switched on in the options
+        "trace": coordinator.tracer.dump(),
+    }
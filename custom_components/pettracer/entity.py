@@ -0,0 +1,126 @@
+"""Base entity for PetTracer."""
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import callback
+from homeassistant.helpers.entity import DeviceInfo, Entity
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+
+from .coordinator import METADATA_KEYS, PetTracerCoordinator
+
+
+@callback
+def async_add_device_entities(
+    coordinator: PetTracerCoordinator,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+    device_entities: Callable[[PetTracerCoordinator, str, dict[str, Any]], list[Entity]],
+) -> None:
+    """Add a platform's entities for every device, now and as devices appear.
+
+    Entities of devices that go away are removed with their device from the
+    registry, a device that comes back later gets its entities again.
+    """
+    known: set[str] = set()
+
+    @callback
+    def add_entities(dev_ids: Iterable[str]) -> None:
+        entities = []
+        for dev_id in dev_ids:
+            if dev_id in known or dev_id not in coordinator.data:
+                continue
+            known.add(dev_id)
+            entities.extend(
+                device_entities(coordinator, dev_id, coordinator.data[dev_id])
+            )
+        if entities:
+            async_add_entities(entities)
+
+    @callback
+    def device_set_changed(added: set[str], removed: set[str]) -> None:
+        known.difference_update(removed)
+        add_entities(added)
+
+    add_entities(list(coordinator.data))
+    entry.async_on_unload(
+        coordinator.async_add_device_set_listener(device_set_changed)
+    )
+
+
+class PetTracerEntity(CoordinatorEntity):
+    """Base class for entities belonging to a single PetTracer device."""
+
+    coordinator: PetTracerCoordinator
+    # Appended to the device name to form the entity name
+    _name_suffix: str | None = None
+    # Device fields the entity state depends on, None for all of them
+    _watched_keys: frozenset[str] | None = None
+
+    def __init__(self, coordinator: PetTracerCoordinator, dev_id: str) -> None:
+        """Initialize the entity."""
+        super().__init__(coordinator)
+        self._dev_id = dev_id
+        # Store version and availability last written to the state machine
+        self._seen_version = coordinator.store.device_version(dev_id)
+        self._seen_available = coordinator.last_update_success
+        if self._watched_keys is not None:
+            # The name and device info follow the metadata fields
+            self._watched_keys = self._watched_keys | METADATA_KEYS
+
+    async def async_added_to_hass(self) -> None:
+        """Subscribe to updates for this entity's device."""
+        await super().async_added_to_hass()
+        # WebSocket pushes are only fanned out to the entities of the device
+        # they concern, REST refreshes still reach every entity.
+        self.async_on_remove(
+            self.coordinator.async_add_device_listener(
+                self._dev_id, self._handle_coordinator_update
+            )
+        )
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        """Return the device info."""
+        return self.coordinator.device_meta(self._dev_id).device_info
+
+    @property
+    def name(self) -> str:
+        """Return the name of the entity."""
+        name = self.coordinator.device_meta(self._dev_id).name
+        if self._name_suffix is None:
+            return name
+        return f"{name} {self._name_suffix}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data, skipping it if no field we show changed."""
+        store = self.coordinator.store
+        version = store.device_version(self._dev_id)
+        available = self.coordinator.last_update_success
+        seen_version, self._seen_version = self._seen_version, version
+        if available == self._seen_available and (
+            version == seen_version
+            or not store.changed_since(self._dev_id, seen_version, self._watched_keys)
+        ):
+            return
+        self._seen_available = available
+        self._handle_device_update()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        """Write the state, counting writes per platform."""
+        if self.platform is not None:
+            self.coordinator.state_writes[self.platform.domain] += 1
+        super().async_write_ha_state()
+
+    @callback
+    def _handle_device_update(self) -> None:
+        """Handle a change to this entity's device."""
+        self.async_write_ha_state()
+
+    def _command_pending(self, actuator: str) -> bool:
+        """Return whether a command for an actuator awaits confirmation."""
+        return self.coordinator.command_tracker.is_pending(self._dev_id, actuator)
@@ -0,0 +1,245 @@
+"""Local geofencing of PetTracer collars against zones and custom polygons."""
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from typing import Any, Iterable, Mapping
+
+from homeassistant.const import ATTR_FRIENDLY_NAME, ATTR_LATITUDE, ATTR_LONGITUDE
+from homeassistant.core import HomeAssistant
+
+ZONE_DOMAIN = "zone"
+ATTR_RADIUS = "radius"
+# Prefix of custom polygon IDs, keeping them apart from zone entity IDs
+POLYGON_ID_PREFIX = "pettracer."
+
+# Size of the grid cells fences are indexed by, about 1.1 km north to south
+CELL_DEGREES = 0.01
+# Fences covering more cells than this are checked on every lookup instead,
+# so a zone the size of a city does not fill the grid
+MAX_CELLS_PER_FENCE = 1024
+# Meters per degree of latitude
+METERS_PER_DEGREE = 111_320.0
+
+
+class Fence(ABC):
+    """An area collars can enter and leave."""
+
+    __slots__ = ("fence_id", "name", "min_lat", "min_lon", "max_lat", "max_lon")
+
+    def __init__(
+        self,
+        fence_id: str,
+        name: str,
+        min_lat: float,
+        min_lon: float,
+        max_lat: float,
+        max_lon: float,
+    ) -> None:
+        """Initialize the fence with its bounding box."""
+        self.fence_id = fence_id
+        self.name = name
+        self.min_lat = min_lat
+        self.min_lon = min_lon
+        self.max_lat = max_lat
+        self.max_lon = max_lon
+
+    def contains(self, lat: float, lon: float) -> bool:
+        """Return whether a point lies inside the fence."""
+        return (
+            self.min_lat <= lat <= self.max_lat
+            and self.min_lon <= lon <= self.max_lon
+            and self._contains(lat, lon)
+        )
+
+    @abstractmethod
+    def _contains(self, lat: float, lon: float) -> bool:
+        """Return whether a point inside the bounding box lies inside the fence."""
+
+
+class CircleFence(Fence):
+    """A circular fence, like a Home Assistant zone."""
+
+    __slots__ = ("lat", "lon", "radius", "_lon_scale")
+
+    def __init__(
+        self, fence_id: str, name: str, lat: float, lon: float, radius: float
+    ) -> None:
+        """Initialize the fence."""
+        self.lat = lat
+        self.lon = lon
+        self.radius = radius
+        # Meters per degree of longitude at the center
+        self._lon_scale = METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6)
+        d_lat = radius / METERS_PER_DEGREE
+        d_lon = radius / self._lon_scale
+        super().__init__(fence_id, name, lat - d_lat, lon - d_lon, lat + d_lat, lon + d_lon)
+
+    def _contains(self, lat: float, lon: float) -> bool:
+        """Return whether a point lies within the radius.
+
+        Uses a flat projection around the center, which is accurate to well
+        under a meter for zones of a few kilometers.
+        """
+        d_y = (lat - self.lat) * METERS_PER_DEGREE
+        d_x = (lon - self.lon) * self._lon_scale
+        return d_x * d_x + d_y * d_y <= self.radius * self.radius
+
+
+class PolygonFence(Fence):
+    """A fence bounded by a polygon of latitude, longitude points."""
+
+    __slots__ = ("_edges",)
+
+    def __init__(
+        self, fence_id: str, name: str, points: list[tuple[float, float]]
+    ) -> None:
+        """Initialize the fence."""
+        lats = [lat for lat, _ in points]
+        lons = [lon for _, lon in points]
+        super().__init__(fence_id, name, min(lats), min(lons), max(lats), max(lons))
+        # Each edge as its start, the latitude of its end and its slope
+        self._edges = tuple(
+            (lat_1, lon_1, lat_2, (lon_2 - lon_1) / (lat_2 - lat_1))
+            for (lat_1, lon_1), (lat_2, lon_2) in zip(points, points[1:] + points[:1])
+            if lat_1 != lat_2
+        )
+
+    def _contains(self, lat: float, lon: float) -> bool:
+        """Return whether a point lies inside, by counting edge crossings."""
+        inside = False
+        for lat_1, lon_1, lat_2, slope in self._edges:
+            if (lat_1 > lat) != (lat_2 > lat) and lon < lon_1 + (lat - lat_1) * slope:
+                inside = not inside
+        return inside
+
+
+def _cell(lat: float, lon: float) -> tuple[int, int]:
+    """Return the grid cell of a point."""
+    return math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES)
+
+
+class GeofenceEngine:
+    """Tell which fences each collar is in as it moves.
+
+    Fences are indexed by the grid cells their bounding boxes overlap, so a
+    position is only tested against the few fences near it however many
+    there are.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the engine."""
+        self._fences: dict[str, Fence] = {}
+        self._grid: dict[tuple[int, int], list[Fence]] = {}
+        self._wide: list[Fence] = []
+        # Fences each collar was last seen in
+        self._inside: dict[str, frozenset[str]] = {}
+
+    @property
+    def fence_count(self) -> int:
+        """Return the number of fences."""
+        return len(self._fences)
+
+    def fence(self, fence_id: str) -> Fence | None:
+        """Return a fence by ID."""
+        return self._fences.get(fence_id)
+
+    def set_fences(self, fences: Iterable[Fence]) -> None:
+        """Replace the fences and rebuild the index.
+
+        Collars stay in fences that still exist; whether they entered new or
+        moved fences is decided on their next position.
+        """
+        self._fences = {fence.fence_id: fence for fence in fences}
+        self._grid = {}
+        self._wide = []
+        for fence in self._fences.values():
+            min_row, min_col = _cell(fence.min_lat, fence.min_lon)
+            max_row, max_col = _cell(fence.max_lat, fence.max_lon)
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > MAX_CELLS_PER_FENCE:
+                self._wide.append(fence)
+                continue
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    self._grid.setdefault((row, col), []).append(fence)
+        for dev_id, inside in self._inside.items():
+            self._inside[dev_id] = inside & self._fences.keys()
+
+    def fences_at(self, lat: float, lon: float) -> frozenset[str]:
+        """Return the IDs of the fences containing a point."""
+        return frozenset(
+            fence.fence_id
+            for fences in (self._grid.get(_cell(lat, lon), ()), self._wide)
+            for fence in fences
+            if fence.contains(lat, lon)
+        )
+
+    def update(
+        self, dev_id: str, lat: float, lon: float
+    ) -> tuple[frozenset[str], frozenset[str]]:
+        """Move a collar, returning the IDs of the fences it entered and left.
+
+        The first position of a collar only sets where it is, so a restart
+        does not report it entering every fence it is in.
+        """
+        inside = self.fences_at(lat, lon)
+        previous = self._inside.get(dev_id)
+        self._inside[dev_id] = inside
+        if previous is None:
+            return frozenset(), frozenset()
+        return inside - previous, previous - inside
+
+    def inside(self, dev_id: str) -> frozenset[str]:
+        """Return the IDs of the fences a collar is in."""
+        return self._inside.get(dev_id, frozenset())
+
+    def remove(self, dev_id: str) -> None:
+        """Forget a collar."""
+        self._inside.pop(dev_id, None)
+
+
+def zone_fences(hass: HomeAssistant) -> list[Fence]:
+    """Return a fence for every Home Assistant zone."""
+    fences: list[Fence] = []
+    for state in hass.states.async_all(ZONE_DOMAIN):
+        try:
+            fences.append(
+                CircleFence(
+                    state.entity_id,
+                    state.attributes.get(ATTR_FRIENDLY_NAME, state.entity_id),
+                    float(state.attributes[ATTR_LATITUDE]),
+                    float(state.attributes[ATTR_LONGITUDE]),
+                    float(state.attributes[ATTR_RADIUS]),
+                )
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+    return fences
+
+
+def polygon_fences(value: Mapping[str, Any] | None) -> list[Fence]:
+    """Return fences for custom polygons given as name: [[lat, lon], ...].
+
+    Raises ValueError if a polygon is malformed.
+    """
+    if not value:
+        return []
+    if not isinstance(value, Mapping):
+        raise ValueError("Geofences must map names to lists of points")
+    fences: list[Fence] = []
+    for name, raw_points in value.items():
+        if not isinstance(raw_points, list) or len(raw_points) < 3:
+            raise ValueError(f"Geofence {name} needs at least 3 points")
+        points = []
+        for raw_point in raw_points:
+            try:
+                lat, lon = (float(coord) for coord in raw_point)
+            except (TypeError, ValueError) as err:
+                raise ValueError(
+                    f"Geofence {name} has a point that is not [lat, lon]"
+                ) from err
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                raise ValueError(f"Geofence {name} has a point out of range")
+            points.append((lat, lon))
+        fences.append(PolygonFence(f"{POLYGON_ID_PREFIX}{name}", str(name), points))
+    return fences
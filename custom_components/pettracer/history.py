@@ -0,0 +1,183 @@
+"""In-memory position history of PetTracer collars."""
+from __future__ import annotations
+
+import math
+from array import array
+from typing import Any, NamedTuple
+
+from homeassistant.util import dt as dt_util
+
+# Positions kept per collar, 32 bytes each
+DEFAULT_CAPACITY = 1000
+
+
+class PositionPoint(NamedTuple):
+    """A recorded collar position."""
+
+    time: float  # UNIX timestamp
+    latitude: float
+    longitude: float
+    accuracy: float | None
+
+
+class PositionBuffer:
+    """Fixed-size ring of positions in time order.
+
+    The fields are kept in parallel arrays of doubles rather than one object
+    per point, and queries only copy out the points they return.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Initialize the buffer."""
+        self.capacity = capacity
+        self._time = array("d", bytes(8 * capacity))
+        self._lat = array("d", bytes(8 * capacity))
+        self._lon = array("d", bytes(8 * capacity))
+        self._acc = array("d", bytes(8 * capacity))
+        # Slot of the oldest point, and the number of points held
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        """Return the number of points held."""
+        return self._size
+
+    def _slot(self, index: int) -> int:
+        """Return the array slot of the index-th oldest point."""
+        return (self._start + index) % self.capacity
+
+    def append(self, time: float, lat: float, lon: float, acc: float | None) -> bool:
+        """Add a position, returning False if it is stale or a repeat.
+
+        Points must be newer than the last one, and a collar that has not
+        moved only gets a point when it first arrives at its position.
+        """
+        if self._size:
+            newest = self._slot(self._size - 1)
+            if time <= self._time[newest] or (
+                lat == self._lat[newest] and lon == self._lon[newest]
+            ):
+                return False
+
+        if self._size < self.capacity:
+            slot = self._slot(self._size)
+            self._size += 1
+        else:
+            # Overwrite the oldest point
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._time[slot] = time
+        self._lat[slot] = lat
+        self._lon[slot] = lon
+        self._acc[slot] = math.nan if acc is None else acc
+        return True
+
+    def _point(self, index: int) -> PositionPoint:
+        """Return the index-th oldest point."""
+        slot = self._slot(index)
+        acc = self._acc[slot]
+        return PositionPoint(
+            self._time[slot],
+            self._lat[slot],
+            self._lon[slot],
+            None if math.isnan(acc) else acc,
+        )
+
+    def _first_at_or_after(self, time: float) -> int:
+        """Return the index of the oldest point not older than time."""
+        low, high = 0, self._size
+        while low < high:
+            mid = (low + high) // 2
+            if self._time[self._slot(mid)] < time:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def last(self, count: int) -> list[PositionPoint]:
+        """Return up to count of the newest points, oldest first."""
+        count = max(0, min(count, self._size))
+        return [self._point(index) for index in range(self._size - count, self._size)]
+
+    def window(self, start: float, end: float | None = None) -> list[PositionPoint]:
+        """Return the points recorded from start up to and including end."""
+        first = self._first_at_or_after(start)
+        if end is None:
+            stop = self._size
+        else:
+            stop = self._first_at_or_after(math.nextafter(end, math.inf))
+        return [self._point(index) for index in range(first, stop)]
+
+
+def _position(device: dict[str, Any]) -> tuple[str, float, float, float | None] | None:
+    """Return the raw time, latitude, longitude and accuracy of a collar's last fix."""
+    last_pos = device.get("lastPos")
+    if not isinstance(last_pos, dict):
+        return None
+    lat = last_pos.get("posLat")
+    lon = last_pos.get("posLong")
+    raw_time = last_pos.get("timeMeasure") or device.get("lastContact")
+    if lat is None or lon is None or not isinstance(raw_time, str) or not raw_time:
+        return None
+    acc = last_pos.get("acc") or last_pos.get("horiPrec")
+    try:
+        return raw_time, float(lat), float(lon), float(acc) if acc is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class PositionHistory:
+    """Position buffers of every collar, fed from REST and WebSocket updates."""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        """Initialize the history."""
+        self._capacity = capacity
+        self._buffers: dict[str, PositionBuffer] = {}
+        # Raw time of the last fix seen per collar, to skip repeats unparsed
+        self._last_raw: dict[str, str] = {}
+
+    @property
+    def point_count(self) -> int:
+        """Return the number of points held over all collars."""
+        return sum(len(buffer) for buffer in self._buffers.values())
+
+    def record(self, dev_id: str, device: dict[str, Any]) -> bool:
+        """Add a collar's last fix, returning whether it was new."""
+        position = _position(device)
+        if position is None:
+            return False
+        raw_time, lat, lon, acc = position
+        if self._last_raw.get(dev_id) == raw_time:
+            return False
+        try:
+            parsed = dt_util.parse_datetime(raw_time)
+        except (TypeError, ValueError):
+            parsed = None
+        if parsed is None:
+            return False
+        if parsed.tzinfo is None:
+            # The portal sends UTC, don't read a missing offset as local time
+            parsed = parsed.replace(tzinfo=dt_util.UTC)
+        self._last_raw[dev_id] = raw_time
+
+        buffer = self._buffers.get(dev_id)
+        if buffer is None:
+            buffer = self._buffers[dev_id] = PositionBuffer(self._capacity)
+        return buffer.append(parsed.timestamp(), lat, lon, acc)
+
+    def last(self, dev_id: str, count: int) -> list[PositionPoint]:
+        """Return up to count of a collar's newest points, oldest first."""
+        buffer = self._buffers.get(dev_id)
+        return buffer.last(count) if buffer is not None else []
+
+    def window(
+        self, dev_id: str, start: float, end: float | None = None
+    ) -> list[PositionPoint]:
+        """Return a collar's points recorded between start and end."""
+        buffer = self._buffers.get(dev_id)
+        return buffer.window(start, end) if buffer is not None else []
+
+    def remove(self, dev_id: str) -> None:
+        """Forget a collar."""
+        self._buffers.pop(dev_id, None)
+        self._last_raw.pop(dev_id, None)
@@ -0,0 +1,191 @@
+"""Connections shared between PetTracer config entries."""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from collections.abc import Mapping
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    CONF_API_KEY,
+    CONF_EMAIL,
+    DATA_HUB,
+    DOMAIN,
+    SNAPSHOT_SAVE_DELAY_SECONDS,
+    SNAPSHOT_STORAGE_VERSION,
+)
+from .coordinator import PetTracerCoordinator
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def account_key(data: Mapping[str, Any]) -> str:
+    """Return the key identifying the account behind config entry data."""
+    if email := data.get(CONF_EMAIL):
+        return f"email:{email.strip().lower()}"
+    return f"api_key:{data.get(CONF_API_KEY)}"
+
+
+def snapshot_store(hass: HomeAssistant, key: str) -> Store:
+    """Return the store holding the last device snapshot of an account."""
+    # Hashed so the file name does not reveal the email address
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return Store(hass, SNAPSHOT_STORAGE_VERSION, f"{DOMAIN}.snapshot.{digest}")
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> PetTracerHub:
+    """Return the hub, creating it on first use."""
+    domain_data = hass.data.setdefault(DOMAIN, {})
+    if DATA_HUB not in domain_data:
+        domain_data[DATA_HUB] = PetTracerHub(hass)
+    return domain_data[DATA_HUB]
+
+
+class PetTracerHub:
+    """Share one coordinator per account between config entries.
+
+    Entries for the same account use the same coordinator, so the account
+    is logged in, polled and connected to the WebSocket once. Pushes are
+    passed on to every coordinator whose account owns the device, unless
+    it gets them through its own WebSocket anyway.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the hub."""
+        self.hass = hass
+        # account key -> coordinator, and the entries using it
+        self._coordinators: dict[str, PetTracerCoordinator] = {}
+        self._entries: dict[str, dict[str, ConfigEntry]] = {}
+        self._locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Tokens from logins made by the config flow, waiting for setup
+        self._handover: dict[str, tuple[str, float | None]] = {}
+        self.routed_pushes = 0
+
+    @property
+    def account_count(self) -> int:
+        """Return the number of accounts with a coordinator."""
+        return len(self._coordinators)
+
+    def entry_count(self, coordinator: PetTracerCoordinator) -> int:
+        """Return the number of entries sharing a coordinator."""
+        return len(self._entries.get(coordinator.account, ()))
+
+    @callback
+    def async_hand_over_token(
+        self, data: Mapping[str, Any], access_token: str, expiry: float | None
+    ) -> None:
+        """Keep a token from the config flow for the entry about to be set up."""
+        self._handover[account_key(data)] = (access_token, expiry)
+
+    async def async_acquire(self, entry: ConfigEntry) -> PetTracerCoordinator:
+        """Return the coordinator for an entry's account, setting it up if needed.
+
+        A new coordinator starts from the account's saved snapshot when there
+        is one, refreshing in the background, and only waits for the cloud
+        when there is not.
+        """
+        key = account_key(entry.data)
+        async with self._locks[key]:
+            coordinator = self._coordinators.get(key)
+            if coordinator is not None:
+                _LOGGER.debug(
+                    "Entry %s shares the connection of entry %s",
+                    entry.entry_id,
+                    coordinator.entry.entry_id,
+                )
+                self._entries[key][entry.entry_id] = entry
+                return coordinator
+
+            coordinator = PetTracerCoordinator(self.hass, entry)
+            # Polling preferences and reauth follow the entry the coordinator
+            # runs for
+            coordinator.config_entry = entry
+            coordinator.hub = self
+            coordinator.account = key
+            if handover := self._handover.pop(key, None):
+                coordinator.tokens.async_set_token(*handover)
+
+            store = snapshot_store(self.hass, key)
+
+            @callback
+            def async_save_snapshot() -> None:
+                """Save the devices after each refresh, at most once per delay."""
+                if coordinator.last_update_success:
+                    store.async_delay_save(
+                        coordinator.async_snapshot, SNAPSHOT_SAVE_DELAY_SECONDS
+                    )
+
+            coordinator.async_add_listener(async_save_snapshot)
+
+            snapshot = await store.async_load()
+            if snapshot and snapshot.get("devices"):
+                _LOGGER.debug(
+                    "Starting from a snapshot of %d devices", len(snapshot["devices"])
+                )
+                coordinator.async_restore(snapshot["devices"])
+                self.hass.async_create_task(coordinator.async_refresh())
+            else:
+                try:
+                    await coordinator.async_config_entry_first_refresh()
+                except Exception:
+                    await coordinator.async_shutdown()
+                    raise
+
+            self._coordinators[key] = coordinator
+            self._entries[key] = {entry.entry_id: entry}
+            return coordinator
+
+    async def async_release(self, entry: ConfigEntry) -> None:
+        """Drop an entry, shutting its coordinator down if no entry is left."""
+        key = account_key(entry.data)
+        async with self._locks[key]:
+            entries = self._entries.get(key)
+            if not entries or entries.pop(entry.entry_id, None) is None:
+                return
+            coordinator = self._coordinators[key]
+            if entries:
+                if coordinator.entry is entry:
+                    # Options now come from an entry that is still loaded
+                    coordinator.entry = next(iter(entries.values()))
+                    coordinator.config_entry = coordinator.entry
+                    coordinator.async_apply_options()
+                return
+
+            del self._coordinators[key]
+            del self._entries[key]
+        await coordinator.async_shutdown()
+
+    def has_account(self, data: Mapping[str, Any]) -> bool:
+        """Return whether an entry for the account behind data is loaded."""
+        return account_key(data) in self._coordinators
+
+    def coordinator_for_device(self, dev_id: str) -> PetTracerCoordinator | None:
+        """Return a coordinator whose account owns a device."""
+        for coordinator in self._coordinators.values():
+            if dev_id in coordinator.store.data:
+                return coordinator
+        return None
+
+    @callback
+    def async_route_push(
+        self, source: PetTracerCoordinator, data: dict[str, Any]
+    ) -> None:
+        """Pass a push received by one account on to the others owning the device."""
+        dev_id = str(data["id"])
+        for coordinator in self._coordinators.values():
+            if (
+                coordinator is source
+                or dev_id not in coordinator.store.data
+                or coordinator.receives_pushes_for(dev_id)
+            ):
+                continue
+            self.routed_pushes += 1
+            # Each coordinator merges pushes into the dict it is handed
+            coordinator.async_handle_push(dict(data))
@@ -0,0 +1,37 @@
+"""Lightweight runtime metrics for PetTracer."""
+from __future__ import annotations
+
+from bisect import bisect_left
+
+# Upper bounds of the latency histogram buckets, in ms
+LATENCY_BUCKETS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """Count latencies into fixed buckets."""
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        # One count per bucket plus one for anything slower
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency: float) -> None:
+        """Add a latency in ms."""
+        self.counts[bisect_left(LATENCY_BUCKETS, latency)] += 1
+        self.total += latency
+        if latency > self.max:
+            self.max = latency
+
+    def as_dict(self) -> dict:
+        """Return the histogram for diagnostics."""
+        count = sum(self.counts)
+        buckets = {f"<={bound}ms": n for bound, n in zip(LATENCY_BUCKETS, self.counts)}
+        buckets[f">{LATENCY_BUCKETS[-1]}ms"] = self.counts[-1]
+        return {
+            "count": count,
+            "mean_ms": round(self.total / count, 1) if count else None,
+            "max_ms": round(self.max, 1),
+            "buckets": buckets,
+        }
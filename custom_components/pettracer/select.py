@@ -5,11 +5,11 @@ from homeassistant.components.select import SelectEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
-from homeassistant.helpers.entity import DeviceInfo
 
 from .const import DOMAIN, MODE_MAP, MODE_MAP_INV
+from .commands import PENDING_COMMANDS
 from .coordinator import PetTracerCoordinator
+from .entity import PetTracerEntity, async_add_device_entities
 
 async def async_setup_entry(
     hass: HomeAssistant,
@@ -18,26 +18,31 @@ async def async_setup_entry(
 ) -> None:
     """Set up PetTracer select entities."""
     coordinator: PetTracerCoordinator = hass.data[DOMAIN][entry.entry_id]
-    
-    entities = []
-    for dev_id, device_data in coordinator.data.items():
-        # Only add mode selector for devices that have a 'mode'
-        if "mode" in device_data:
-            entities.append(PetTracerModeSelect(coordinator, dev_id))
-    
-    async_add_entities(entities)
+    async_add_device_entities(coordinator, entry, async_add_entities, _device_entities)
 
-class PetTracerModeSelect(CoordinatorEntity, SelectEntity):
+
+def _device_entities(
+    coordinator: PetTracerCoordinator, dev_id: str, device_data: dict
+) -> list[PetTracerModeSelect]:
+    """Return the select entities of a device."""
+    # Only add mode selector for devices that have a 'mode'
+    if "mode" in device_data:
+        return [PetTracerModeSelect(coordinator, dev_id)]
+    return []
+
+class PetTracerModeSelect(PetTracerEntity, SelectEntity):
     """Representation of a PetTracer mode selector."""
 
+    _name_suffix = "Mode"
+    _watched_keys = frozenset(("mode", "cmdNr", PENDING_COMMANDS))
+
     def __init__(self, coordinator: PetTracerCoordinator, dev_id: str) -> None:
         """Initialize the selector."""
-        super().__init__(coordinator)
-        self._dev_id = dev_id
+        super().__init__(coordinator, dev_id)
         
         # Initialize state from coordinator data
         data = self.coordinator.data.get(self._dev_id, {})
-        self._last_contact = data.get("lastContact")
+        self._pending = False
         
         current_val = data.get("mode") or data.get("cmdNr")
         if current_val in MODE_MAP_INV:
@@ -51,25 +56,9 @@ class PetTracerModeSelect(CoordinatorEntity, SelectEntity):
         return f"{self._dev_id}_mode"
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        name = details.get("name") or f"Pet {self._dev_id}"
-        return DeviceInfo(
-            identifiers={(DOMAIN, str(self._dev_id))},
-            name=name,
-            manufacturer="PetTracer",
-            model="GPS Collar",
-            sw_version=self.coordinator.data.get(self._dev_id, {}).get("sw"),
-            configuration_url="https://portal.pettracer.com/",
-        )
-
-    @property
-    def name(self) -> str:
-        """Return the name of the entity."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        base_name = details.get("name") or f"Pet {self._dev_id}"
-        return f"{base_name} Mode"
+    def extra_state_attributes(self) -> dict:
+        """Return whether a mode change is awaiting confirmation."""
+        return {"pending": self._pending}
 
     @property
     def options(self) -> list[str]:
@@ -86,20 +75,12 @@ class PetTracerModeSelect(CoordinatorEntity, SelectEntity):
             
             await self.coordinator.set_collar_mode(self._dev_id, val)
 
-    def _handle_coordinator_update(self) -> None:
-        """Handle coordinator update."""
-        data = self.coordinator.data.get(self._dev_id, {})
-        new_contact = data.get("lastContact")
-        
-        # Only update state if lastContact has changed
-        if new_contact != self._last_contact:
-            self._last_contact = new_contact
-            
+    def _handle_device_update(self) -> None:
+        """Handle device update."""
+        self._pending = self._command_pending("mode")
+        # Keep the optimistic option until the collar confirms the command
+        if not self._pending:
+            data = self.coordinator.data.get(self._dev_id, {})
             current_val = data.get("mode") or data.get("cmdNr")
-            if current_val in MODE_MAP_INV:
-                self._attr_current_option = MODE_MAP_INV[current_val]
-            else:
-                self._attr_current_option = None
-                
-            self.async_write_ha_state()
-
+            self._attr_current_option = MODE_MAP_INV.get(current_val)
+        self.async_write_ha_state()
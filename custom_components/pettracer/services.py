@@ -0,0 +1,94 @@
+"""Services for PetTracer."""
+from __future__ import annotations
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, device_registry as dr
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .history import DEFAULT_CAPACITY, PositionPoint
+from .hub import async_get_hub
+
+SERVICE_GET_POSITION_HISTORY = "get_position_history"
+
+ATTR_DEVICE_ID = "device_id"
+ATTR_LAST = "last"
+ATTR_START = "start"
+ATTR_END = "end"
+
+# Points returned when neither a count nor a start is given
+DEFAULT_POINTS = 100
+
+GET_POSITION_HISTORY_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_DEVICE_ID): cv.string,
+        vol.Exclusive(ATTR_LAST, "range"): vol.All(
+            vol.Coerce(int), vol.Range(min=1, max=DEFAULT_CAPACITY)
+        ),
+        vol.Exclusive(ATTR_START, "range"): cv.datetime,
+        vol.Optional(ATTR_END): cv.datetime,
+    }
+)
+
+
+def _as_dict(point: PositionPoint) -> dict:
+    """Return a point as service response data."""
+    return {
+        "time": dt_util.utc_from_timestamp(point.time).isoformat(),
+        "latitude": point.latitude,
+        "longitude": point.longitude,
+        "accuracy": point.accuracy,
+    }
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the PetTracer services."""
+
+    async def async_get_position_history(call: ServiceCall) -> ServiceResponse:
+        """Return recent positions of a collar from memory."""
+        device = dr.async_get(hass).async_get(call.data[ATTR_DEVICE_ID])
+        dev_id = next(
+            (
+                identifier
+                for domain, identifier in (device.identifiers if device else ())
+                if domain == DOMAIN
+            ),
+            None,
+        )
+        coordinator = (
+            async_get_hub(hass).coordinator_for_device(dev_id) if dev_id else None
+        )
+        if coordinator is None:
+            raise ServiceValidationError(
+                f"{call.data[ATTR_DEVICE_ID]} is not a loaded PetTracer device"
+            )
+
+        if ATTR_START in call.data or ATTR_END in call.data:
+            start = call.data.get(ATTR_START)
+            end = call.data.get(ATTR_END)
+            points = coordinator.positions.window(
+                dev_id,
+                dt_util.as_utc(start).timestamp() if start else 0,
+                dt_util.as_utc(end).timestamp() if end else None,
+            )
+        else:
+            points = coordinator.positions.last(
+                dev_id, call.data.get(ATTR_LAST, DEFAULT_POINTS)
+            )
+        return {"points": [_as_dict(point) for point in points]}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_POSITION_HISTORY,
+        async_get_position_history,
+        schema=GET_POSITION_HISTORY_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
@@ -0,0 +1,103 @@
+"""Versioned device state store for PetTracer."""
+from __future__ import annotations
+
+from typing import Any, Iterable
+
+_MISSING = object()
+
+
+class DeviceStateStore:
+    """Hold the latest state of every device, updated in place.
+
+    Every change bumps a store-wide counter and stamps the device and each
+    field that changed with it, so consumers can tell whether a device, or
+    just the fields they show, changed since a version they have seen
+    without copying or comparing dicts themselves.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the store."""
+        self.data: dict[str, dict[str, Any]] = {}
+        self.version = 0
+        self._versions: dict[str, int] = {}
+        # dev_id -> field -> version it last changed at
+        self._key_versions: dict[str, dict[str, int]] = {}
+
+    def device_version(self, dev_id: str) -> int:
+        """Return the version a device was last changed at, 0 if unknown."""
+        return self._versions.get(dev_id, 0)
+
+    def changed_since(
+        self, dev_id: str, version: int, keys: Iterable[str] | None = None
+    ) -> bool:
+        """Return whether a device, or any of the given fields, changed after a version."""
+        if keys is None:
+            return self._versions.get(dev_id, 0) > version
+        key_versions = self._key_versions.get(dev_id, {})
+        return any(key_versions.get(key, 0) > version for key in keys)
+
+    def update(self, dev_id: str, fields: dict[str, Any]) -> bool:
+        """Merge fields into a device, returning whether anything changed.
+
+        A new device takes ownership of the passed dict.
+        """
+        device = self.data.get(dev_id)
+        if device is None:
+            self.data[dev_id] = fields
+            self._bump(dev_id, fields)
+            return True
+        changed = [
+            key for key, value in fields.items()
+            if device.get(key, _MISSING) != value
+        ]
+        if not changed:
+            return False
+        device.update(fields)
+        self._bump(dev_id, changed)
+        return True
+
+    def replace(self, devices: dict[str, dict[str, Any]]) -> set[str]:
+        """Load a full snapshot, returning the IDs of devices that changed.
+
+        Known devices keep their dict identity, devices missing from the
+        snapshot are dropped.
+        """
+        changed = set()
+        for dev_id, fields in devices.items():
+            device = self.data.get(dev_id)
+            if device is None:
+                self.data[dev_id] = fields
+                self._bump(dev_id, fields)
+            elif device == fields:
+                continue
+            else:
+                keys = [
+                    key for key, value in fields.items()
+                    if device.get(key, _MISSING) != value
+                ]
+                keys.extend(key for key in device if key not in fields)
+                device.clear()
+                device.update(fields)
+                self._bump(dev_id, keys)
+            changed.add(dev_id)
+
+        for dev_id in [dev_id for dev_id in self.data if dev_id not in devices]:
+            self._bump(dev_id, self.data.pop(dev_id))
+            changed.add(dev_id)
+        return changed
+
+    def touch(self, dev_id: str, key: str) -> None:
+        """Mark a field of a device changed without new data.
+
+        Used for something derived from the device that is not part of its
+        data, like pending commands, under a key the API does not use.
+        """
+        self._bump(dev_id, (key,))
+
+    def _bump(self, dev_id: str, keys: Iterable[str]) -> None:
+        """Stamp a device and the given fields with a new version."""
+        self.version += 1
+        self._versions[dev_id] = self.version
+        key_versions = self._key_versions.setdefault(dev_id, {})
+        for key in keys:
+            key_versions[key] = self.version
@@ -2,18 +2,32 @@
 from __future__ import annotations
 
 import asyncio
-import json
 import logging
 import random
 import string
 import time
-from typing import Callable, Any
+from collections import Counter
+from typing import Callable, Any, Iterable
 
 import aiohttp
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from . import codec
+from .auth import TokenManager
+from .stomp_parser import StompFrameParser
+from .tracing import FrameTracer
 
 _LOGGER = logging.getLogger("custom_components.pettracer")
 
+# Reconnect backoff: the first retry is immediate, later ones wait a random
+# time up to BASE * 2^(n-1) seconds, capped at MAX
+RECONNECT_BASE_DELAY = 2
+RECONNECT_MAX_DELAY = 300
+
+# STOMP heartbeat (newline char) wrapped in a SockJS frame
+HEARTBEAT_FRAME = codec.dumps(["\n"])
+
 class StompClient:
     """STOMP over SockJS client."""
 
@@ -22,28 +36,91 @@ class StompClient:
         hass: HomeAssistant,
         ws_url: str,
         access_token: str,
-        device_ids: list[int] | None,  # Properly type hint optional
+        device_ids: Iterable[int] | None,
         callback: Callable[[dict[str, Any]], None],
+        state_callback: Callable[[], None] | None = None,
+        session: aiohttp.ClientSession | None = None,
+        tokens: TokenManager | None = None,
+        tracer: FrameTracer | None = None,
     ) -> None:
         """Initialize the client."""
         self.hass = hass
         self.ws_url = ws_url
         self.access_token = access_token
-        self.device_ids = device_ids or []  # Handle None/Optional
+        # Devices subscribed to, or to subscribe to on the next connect
+        self.device_ids: set[int] = set(device_ids or ())
         self.callback = callback
+        # Share HA's pooled session so reconnects reuse its connector, DNS
+        # cache and SSL context instead of building them from scratch
+        self._session = session or async_get_clientsession(hass)
+        # When given, handshakes use its current token and report rejections
+        self._tokens = tokens
+        self.tracer = tracer or FrameTracer()
+        # Called when the STOMP session comes up or the connection drops
+        self.state_callback = state_callback
+        # Monotonic time of the last frame received, heartbeats included
+        self.last_message: float | None = None
+        # Time taken by the last WebSocket handshake, in ms
+        self.last_connect_duration: float | None = None
+        # Failed attempts since the last STOMP CONNECTED
+        self._attempt = 0
+        self.reconnect_count = 0
+        self._disconnected_since: float | None = time.monotonic()
+        self._disconnected_total = 0.0
         self._ws: aiohttp.ClientWebSocketResponse | None = None
         self._running = False
         self._connected = False
         self._reconnect_task: asyncio.Task | None = None
+        # Sends STOMP heartbeats while a session is up, one per connection
+        self._heartbeat_task: asyncio.Task | None = None
+        self._parser = StompFrameParser()
+        # WebSocket messages received, STOMP bodies decoded, decode failures
+        self.stats = {"messages": 0, "parsed": 0, "parse_failures": 0}
+        # Incremental subscribe and unsubscribe frames sent
+        self.subscription_updates = 0
+        # SockJS frames by type letter and STOMP frames by command
+        self.sockjs_frames: Counter[str] = Counter()
+        self.stomp_frames: Counter[str] = Counter()
+
+    @property
+    def connected(self) -> bool:
+        """Return whether the STOMP session is up."""
+        return self._connected
+
+    @property
+    def buffered(self) -> int:
+        """Return the number of characters waiting for the rest of a frame."""
+        return self._parser.buffered
+
+    @property
+    def disconnected_seconds(self) -> float:
+        """Return the total time spent without a STOMP session."""
+        total = self._disconnected_total
+        if self._disconnected_since is not None:
+            total += time.monotonic() - self._disconnected_since
+        return total
+
+    def _reconnect_delay(self) -> float:
+        """Return how long to wait before the next connection attempt."""
+        attempt = self._attempt
+        self._attempt += 1
+        if attempt == 0:
+            return 0
+        return random.uniform(
+            0, min(RECONNECT_MAX_DELAY, RECONNECT_BASE_DELAY * 2 ** (attempt - 1))
+        )
+
+    def _notify_state(self) -> None:
+        """Tell the owner the connection state changed."""
+        if self.state_callback:
+            self.state_callback()
 
     def update_token(self, access_token: str) -> None:
         """Update the access token."""
+        # The token is only checked during the handshake, so a live session
+        # carries on and the next reconnect uses the new one. Clients given a
+        # TokenManager fetch the current token before every handshake.
         self.access_token = access_token
-        # If running, maybe trigger reconnect?
-        # For now let the next reconnect cycle pick it up or force it
-        if self._running and self._connected:
-             # Force reconnect logic here is complex without blocking loop
-             pass
 
     async def start(self) -> None:
         """Start the client."""
@@ -54,6 +131,7 @@ class StompClient:
     async def stop(self) -> None:
         """Stop the client."""
         self._running = False
+        self._cancel_heartbeat()
         if self._ws:
             await self._ws.close()
         if self._reconnect_task:
@@ -78,42 +156,64 @@ class StompClient:
         _LOGGER.debug("Entering _connect_loop")
         while self._running:
             try:
+                if self._tokens:
+                    self.access_token = await self._tokens.async_get_token()
                 session_id = self._generate_session_id()
                 server_id = self._generate_server_id()
                 # Construct SockJS URL
                 # Format: {base_url}/{server_id}/{session_id}/websocket
                 url = f"{self.ws_url}/{server_id}/{session_id}/websocket?access_token={self.access_token}"
 
-                _LOGGER.info("Connecting to WebSocket: %s", url)
+                # Leave the access token out of the log
+                _LOGGER.info("Connecting to WebSocket: %s", url.partition("?")[0])
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.ws_connect(url, heartbeat=30) as ws:
-                        self._ws = ws
-                        self._connected = True
-                        _LOGGER.info("WebSocket connected")
-
-                        # Handle messages
-                        async for msg in ws:
-                            if not self._running:
-                                _LOGGER.debug("Unhandled message received after stop signal, ignoring")
-                                break
-
-                            if msg.type == aiohttp.WSMsgType.TEXT:
-                                await self._handle_message(msg.data)
-                            elif msg.type == aiohttp.WSMsgType.ERROR:
-                                _LOGGER.error("WebSocket error: %s", msg.data)
-                                break
-                            elif msg.type == aiohttp.WSMsgType.CLOSED:
-                                _LOGGER.debug("CLOSED message received")
-                                break
+                start = time.monotonic()
+                async with self._session.ws_connect(url, heartbeat=30) as ws:
+                    self._ws = ws
+                    self._connected = True
+                    self._parser.reset()
+                    self.last_connect_duration = (time.monotonic() - start) * 1000
+                    _LOGGER.info(
+                        "WebSocket connected in %.0fms", self.last_connect_duration
+                    )
+
+                    # Handle messages
+                    async for msg in ws:
+                        if not self._running:
+                            _LOGGER.debug("Unhandled message received after stop signal, ignoring")
+                            break
 
+                        self.last_message = time.monotonic()
+                        self.stats["messages"] += 1
+                        if msg.type == aiohttp.WSMsgType.TEXT:
+                            await self._handle_message(msg.data)
+                        elif msg.type == aiohttp.WSMsgType.ERROR:
+                            _LOGGER.error("WebSocket error: %s", msg.data)
+                            break
+                        elif msg.type == aiohttp.WSMsgType.CLOSED:
+                            _LOGGER.debug("CLOSED message received")
+                            break
+
+            except aiohttp.WSServerHandshakeError as err:
+                _LOGGER.error("WebSocket handshake failed: %s", err.status)
+                if err.status == 401 and self._tokens:
+                    self._tokens.async_invalidate(self.access_token)
             except Exception as err:
                 _LOGGER.error("WebSocket connection error: %s", err)
 
-            self._connected = False
+            # Must not outlive its socket, an immediate reconnect would leave
+            # it running next to the new connection's heartbeat
+            self._cancel_heartbeat()
+            if self._connected:
+                self._connected = False
+                self._notify_state()
+            if self._disconnected_since is None:
+                self._disconnected_since = time.monotonic()
             if self._running:
-                _LOGGER.debug("Reconnecting WebSocket in 10 seconds...")
-                await asyncio.sleep(10)
+                delay = self._reconnect_delay()
+                self.reconnect_count += 1
+                _LOGGER.debug("Reconnecting WebSocket in %.1f seconds...", delay)
+                await asyncio.sleep(delay)
 
     async def _handle_message(self, data: str) -> None:
         """Handle incoming WebSocket message."""
@@ -126,7 +226,11 @@ class StompClient:
         # a: Array of messages
         # c: Close frame
 
+        if self.tracer.enabled:
+            self.tracer.record("in", data)
+
         frame_type = data[0]
+        self.sockjs_frames[frame_type] += 1
         
         if frame_type == "o":
             _LOGGER.debug("SockJS Open Frame received")
@@ -137,29 +241,32 @@ class StompClient:
             # _LOGGER.debug("SockJS Heartbeat")
             pass
         elif frame_type == "a":
-            _LOGGER.debug("SockJS Message Array received: %s", data[:100] + "..." if len(data) > 100 else data)
             # Message array
             try:
-                messages = json.loads(data[1:])
+                messages = codec.loads(data[1:])
                 for msg in messages:
                     await self._handle_stomp_message(msg)
-            except json.JSONDecodeError:
+            except codec.JSONDecodeError:
+                self.stats["parse_failures"] += 1
                 _LOGGER.error("Failed to decode SockJS message: %s", data)
         elif frame_type == "c":
             # Close frame
             _LOGGER.info("SockJS close frame received: %s", data)
 
+    def _cancel_heartbeat(self) -> None:
+        """Stop sending heartbeats."""
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
     async def _heartbeat_sender(self) -> None:
         """Send periodic STOMP heartbeats."""
         try:
             while self._running and self._connected:
                 await asyncio.sleep(9)  # Send slightly faster than 10s timeout
                 if self._ws and not self._ws.closed:
-                     # Send STOMP heartbeat (newline char) wrapped in SockJS frame
-                     # Use compact separators to match JS JSON.stringify behavior
-                     heartbeat_frame = json.dumps(["\n"], separators=(",", ":"))
                      try:
-                        await self._ws.send_str(heartbeat_frame)
+                        await self._ws.send_str(HEARTBEAT_FRAME)
                      except Exception as e:
                         _LOGGER.debug("Failed to send heartbeat: %s", e)
                         break
@@ -180,59 +287,49 @@ class StompClient:
 
     async def _handle_stomp_message(self, msg: str) -> None:
         """Handle STOMP message content."""
-        # STOMP heartbeats are often just a newline character
-        if not msg or msg == "\n" or msg == "\r\n":
-            # _LOGGER.debug("Received STOMP Heartbeat")
-            return
-
-        # Handle multiple STOMP frames in a single message (if they are concatenated)
-        # Split by NULL byte
-        frames = msg.split("\u0000")
-        
-        for frame in frames:
-            frame = frame.strip()
-            if not frame:
-                continue
-                
-            if frame.startswith("CONNECTED"):
+        # A SockJS message may hold part of a frame, several frames or just a
+        # heart-beat newline; the parser buffers whatever is incomplete
+        for frame in self._parser.feed(msg):
+            self.stomp_frames[frame.command] += 1
+            if frame.command == "CONNECTED":
                 _LOGGER.info("STOMP CONNECTED - Frame received")
                 self._connected = True
+                self._attempt = 0
+                if self._disconnected_since is not None:
+                    self._disconnected_total += time.monotonic() - self._disconnected_since
+                    self._disconnected_since = None
                 # Subscribe after connection
                 await self._send_stomp_subscribe()
                 # Start heartbeat sender task if negotiated
-                self.hass.loop.create_task(self._heartbeat_sender())
-            elif frame.startswith("MESSAGE"):
-                _LOGGER.debug("Received STOMP MESSAGE frame")
-                # Parse MESSAGE frame to extract body
+                if self._heartbeat_task is None or self._heartbeat_task.done():
+                    self._heartbeat_task = self.hass.loop.create_task(
+                        self._heartbeat_sender()
+                    )
+                self._notify_state()
+            elif frame.command == "MESSAGE":
+                if not frame.body:
+                    _LOGGER.warning("STOMP message empty body")
+                    continue
                 try:
-                    # Find the first occurrence of double newline which separates headers from body
-                    body_start = frame.find("\n\n")
-                    if body_start != -1:
-                        # +2 for the two newlines
-                        body = frame[body_start + 2:]
-                        
-                        if body:
-                            _LOGGER.debug("STOMP body found, parsing JSON")
-                            try:
-                                json_body = json.loads(body)
-                                _LOGGER.debug("STOMP message parsed: %s", json_body)
-                                
-                                # Ensure callback is called on the loop
-                                if self.hass and self.hass.loop and self.hass.loop.is_running():
-                                     self.hass.loop.call_soon(self.callback, json_body)
-                                else:
-                                     self.callback(json_body)
-                            except json.JSONDecodeError:
-                                # Sometimes body is not JSON or is a partial fragment
-                                _LOGGER.debug("STOMP body not JSON: %s", body)
-                        else:
-                            _LOGGER.warning("STOMP message empty body")
-                    else:
-                        _LOGGER.warning("STOMP message no header separator")
-                except Exception as err:
-                    _LOGGER.error("Error parsing STOMP frame: %s", err)
+                    json_body = codec.loads(frame.body)
+                except codec.JSONDecodeError:
+                    self.stats["parse_failures"] += 1
+                    _LOGGER.debug("STOMP body not JSON: %s", frame.body)
+                    continue
+                self.stats["parsed"] += 1
+
+                # Ensure callback is called on the loop
+                if self.hass and self.hass.loop and self.hass.loop.is_running():
+                    self.hass.loop.call_soon(self.callback, json_body)
+                else:
+                    self.callback(json_body)
+            elif frame.command == "ERROR":
+                _LOGGER.error(
+                    "STOMP ERROR frame received: %s",
+                    frame.headers.get("message") or frame.body,
+                )
             else:
-                 _LOGGER.debug("Received other STOMP frame type: %s...", frame[:20])
+                _LOGGER.debug("Received other STOMP frame type: %s", frame.command)
 
     async def _send_stomp_subscribe(self) -> None:
         """Send STOMP SUBSCRIBE frame."""
@@ -259,24 +356,51 @@ class StompClient:
         await self._send_sockjs_message(subscribe_frame_1)
         
         if self.device_ids:
-             # Browser sends: {"deviceIds":[12345,67890]}
-             # The key is deviceIds string, value is array of ints
-             payload = json.dumps({"deviceIds": self.device_ids}, separators=(",", ":"))
-             send_frame = (
-                 "SEND\n"
-                 "destination:/app/subscribe\n"
-                 f"content-length:{len(payload)}\n"
-                 "\n"
-                 f"{payload}"
-                 "\u0000"
-             )
-             _LOGGER.info("Sending device subscription to /app/subscribe with payload: %s", payload)
-             await self._send_sockjs_message(send_frame)
+            _LOGGER.info("Subscribing to devices %s", sorted(self.device_ids))
+            await self._send_device_ids("/app/subscribe", self.device_ids)
+
+    async def async_set_devices(self, device_ids: Iterable[int]) -> None:
+        """Change the subscribed devices on the live connection."""
+        device_ids = set(device_ids)
+        added = device_ids - self.device_ids
+        removed = self.device_ids - device_ids
+        if not added and not removed:
+            return
+        self.device_ids = device_ids
+        # Otherwise the next CONNECTED subscribes to the new set
+        if not self._connected:
+            return
+        try:
+            if added:
+                _LOGGER.debug("Subscribing to added devices %s", sorted(added))
+                await self._send_device_ids("/app/subscribe", added)
+                self.subscription_updates += 1
+            if removed:
+                _LOGGER.debug("Unsubscribing from removed devices %s", sorted(removed))
+                await self._send_device_ids("/app/unsubscribe", removed)
+                self.subscription_updates += 1
+        except (aiohttp.ClientError, ConnectionError) as err:
+            # The reconnect subscribes to the whole set again
+            _LOGGER.debug("Could not update subscriptions: %s", err)
+
+    async def _send_device_ids(self, destination: str, device_ids: Iterable[int]) -> None:
+        """Send device IDs to a portal destination."""
+        # Browser sends: {"deviceIds":[12345,67890]}
+        payload = codec.dumps({"deviceIds": sorted(device_ids)})
+        send_frame = (
+            "SEND\n"
+            f"destination:{destination}\n"
+            f"content-length:{len(payload)}\n"
+            "\n"
+            f"{payload}"
+            "\u0000"
+        )
+        await self._send_sockjs_message(send_frame)
 
     async def _send_sockjs_message(self, message: str) -> None:
         """Wrap message in SockJS array and send."""
         if self._ws and not self._ws.closed:
-            _LOGGER.debug("Sending SockJS message: %s", message)
-            # Use compact separators to match JS JSON.stringify behavior
-            sockjs_frame = json.dumps([message], separators=(",", ":"))
+            sockjs_frame = codec.dumps([message])
+            if self.tracer.enabled:
+                self.tracer.record("out", sockjs_frame)
             await self._ws.send_str(sockjs_frame)
@@ -0,0 +1,136 @@
+"""Incremental STOMP frame parser for PetTracer."""
+from __future__ import annotations
+
+import logging
+from typing import NamedTuple
+
+_LOGGER = logging.getLogger("custom_components.pettracer")
+
+# Give up on a partial frame that grows past this many characters
+MAX_BUFFER_SIZE = 1024 * 1024
+
+_HEADER_ESCAPES = {"\\n": "\n", "\\r": "\r", "\\c": ":", "\\\\": "\\"}
+
+
+class StompFrame(NamedTuple):
+    """A complete STOMP frame."""
+
+    command: str
+    headers: dict[str, str]
+    body: str
+
+
+def _unescape_header(value: str) -> str:
+    """Undo STOMP header value escaping."""
+    if "\\" not in value:
+        return value
+    out = []
+    i = 0
+    while i < len(value):
+        pair = value[i : i + 2]
+        if pair in _HEADER_ESCAPES:
+            out.append(_HEADER_ESCAPES[pair])
+            i += 2
+        else:
+            out.append(value[i])
+            i += 1
+    return "".join(out)
+
+
+def _header_end(buf: str, pos: int) -> tuple[int, int]:
+    """Return where the header block ends and the body starts, (-1, -1) if incomplete."""
+    lf = buf.find("\n\n", pos)
+    crlf = buf.find("\r\n\r\n", pos)
+    if crlf != -1 and (lf == -1 or crlf < lf):
+        return crlf, crlf + 4
+    if lf != -1:
+        return lf, lf + 2
+    return -1, -1
+
+
+class StompFrameParser:
+    """Turn a stream of STOMP text into complete frames.
+
+    Data may be fed in arbitrary pieces: frames split across SockJS messages
+    are buffered until complete, and several frames in one piece are all
+    returned. A content-length header is honoured, so bodies may contain NUL.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the parser."""
+        self._buffer = ""
+
+    @property
+    def buffered(self) -> int:
+        """Return the number of characters waiting for the rest of a frame."""
+        return len(self._buffer)
+
+    def reset(self) -> None:
+        """Drop any partial frame, e.g. after a reconnect."""
+        self._buffer = ""
+
+    def feed(self, data: str) -> list[StompFrame]:
+        """Add data and return the frames it completes."""
+        buf = self._buffer + data if self._buffer else data
+        size = len(buf)
+        frames: list[StompFrame] = []
+        pos = 0
+
+        while True:
+            # Skip heart-beats (bare EOLs) between frames
+            while pos < size and buf[pos] in "\r\n":
+                pos += 1
+            if pos >= size:
+                break
+
+            header_end, body_start = _header_end(buf, pos)
+            if header_end == -1:
+                break
+
+            lines = buf[pos:header_end].split("\n")
+            command = lines[0].rstrip("\r")
+            headers: dict[str, str] = {}
+            for line in lines[1:]:
+                key, _, value = line.rstrip("\r").partition(":")
+                # Repeated headers: the first one wins
+                headers.setdefault(key, _unescape_header(value))
+
+            body_end = self._body_end(buf, body_start, headers.get("content-length"))
+            if body_end == -1:
+                break
+
+            frames.append(StompFrame(command, headers, buf[body_start:body_end]))
+            pos = body_end + 1
+
+        self._buffer = buf[pos:] if pos < size else ""
+        if len(self._buffer) > MAX_BUFFER_SIZE:
+            _LOGGER.warning(
+                "Discarding %d characters of unterminated STOMP data", len(self._buffer)
+            )
+            self._buffer = ""
+        return frames
+
+    @staticmethod
+    def _body_end(buf: str, start: int, content_length: str | None) -> int:
+        """Return the index of the NUL ending the body, -1 if incomplete."""
+        if content_length is not None:
+            try:
+                length = int(content_length)
+            except ValueError:
+                length = -1
+            if length >= 0:
+                end = start + length
+                body = buf[start:end]
+                if not body.isascii():
+                    # content-length counts UTF-8 bytes, so the body holds
+                    # fewer characters than that
+                    raw = body.encode()
+                    if len(raw) < length:
+                        return -1
+                    end = start + len(raw[:length].decode(errors="ignore"))
+                if end >= len(buf):
+                    return -1
+                if buf[end] == "\0":
+                    return end
+                _LOGGER.debug("STOMP content-length does not match body, using NUL")
+        return buf.find("\0", start)
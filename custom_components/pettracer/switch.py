@@ -3,14 +3,14 @@ from __future__ import annotations
 
 import logging
 from homeassistant.components.switch import SwitchEntity, SwitchDeviceClass
-from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.helpers.entity import DeviceInfo
 
 from .const import DOMAIN
+from .commands import PENDING_COMMANDS
 from .coordinator import PetTracerCoordinator
+from .entity import PetTracerEntity, async_add_device_entities
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -21,33 +21,36 @@ async def async_setup_entry(
 ) -> None:
     """Set up the PetTracer switches."""
     coordinator: PetTracerCoordinator = hass.data[DOMAIN][entry.entry_id]
-    
-    entities = []
-    for dev_id, device_data in coordinator.data.items():
-        # Only add switches for collars (type=0 or type missing, but definitely not homestation type=1)
-        # We can also check for presence of controllable flags like 'led' or 'buz'
-        if device_data.get("type") == 1:
-            continue
-            
-        entities.append(PetTracerLEDSwitch(coordinator, dev_id))
-        entities.append(PetTracerBuzzerSwitch(coordinator, dev_id))
-    
-    async_add_entities(entities)
-
-class PetTracerLEDSwitch(CoordinatorEntity, SwitchEntity):
+    async_add_device_entities(coordinator, entry, async_add_entities, _device_entities)
+
+
+def _device_entities(
+    coordinator: PetTracerCoordinator, dev_id: str, device_data: dict
+) -> list[SwitchEntity]:
+    """Return the switches of a device."""
+    # Only add switches for collars (type=0 or type missing, but definitely not homestation type=1)
+    # We can also check for presence of controllable flags like 'led' or 'buz'
+    if device_data.get("type") == 1:
+        return []
+    return [
+        PetTracerLEDSwitch(coordinator, dev_id),
+        PetTracerBuzzerSwitch(coordinator, dev_id),
+    ]
+
+class PetTracerLEDSwitch(PetTracerEntity, SwitchEntity):
     """Switch to control the collar LED."""
     
     _attr_device_class = SwitchDeviceClass.SWITCH
     _attr_has_entity_name = True
+    _name_suffix = "LED"
+    _watched_keys = frozenset(("led", PENDING_COMMANDS))
 
     def __init__(self, coordinator: PetTracerCoordinator, dev_id: str) -> None:
         """Initialize the switch."""
-        super().__init__(coordinator)
-        self._dev_id = dev_id
+        super().__init__(coordinator, dev_id)
         
         # Initialize state from coordinator data
         data = self.coordinator.data.get(self._dev_id, {})
-        self._last_contact = data.get("lastContact")
         self._attr_is_on = data.get("led") is True
         
     @property
@@ -56,25 +59,9 @@ class PetTracerLEDSwitch(CoordinatorEntity, SwitchEntity):
         return f"{self._dev_id}_led"
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        name = details.get("name") or f"Pet {self._dev_id}"
-        return DeviceInfo(
-            identifiers={(DOMAIN, str(self._dev_id))},
-            name=name,
-            manufacturer="PetTracer",
-            model="GPS Collar",
-            sw_version=self.coordinator.data.get(self._dev_id, {}).get("sw"),
-            configuration_url="https://portal.pettracer.com/",
-        )
-
-    @property
-    def name(self) -> str:
-        """Return the name of the entity."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        base_name = details.get("name") or f"Pet {self._dev_id}"
-        return f"{base_name} LED"
+    def extra_state_attributes(self) -> dict:
+        """Return whether a command is awaiting confirmation."""
+        return {"pending": self._command_pending("led")}
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn the switch on."""
@@ -92,31 +79,29 @@ class PetTracerLEDSwitch(CoordinatorEntity, SwitchEntity):
         
         await self.coordinator.set_led(self._dev_id, False)
 
-    def _handle_coordinator_update(self) -> None:
-        """Handle coordinator update."""
+    def _handle_device_update(self) -> None:
+        """Handle device update."""
         data = self.coordinator.data.get(self._dev_id, {})
-        new_contact = data.get("lastContact")
-        
-        # Always update state (WebSocket pushes updates without requiring lastContact change)
-        self._last_contact = new_contact
-        self._attr_is_on = data.get("led") is True
+        # Keep the optimistic state until the collar confirms the command
+        if not self._command_pending("led"):
+            self._attr_is_on = data.get("led") is True
         self.async_write_ha_state()
 
 
-class PetTracerBuzzerSwitch(CoordinatorEntity, SwitchEntity):
+class PetTracerBuzzerSwitch(PetTracerEntity, SwitchEntity):
     """Switch to control the collar buzzer."""
     
     _attr_device_class = SwitchDeviceClass.SWITCH
     _attr_has_entity_name = True
+    _name_suffix = "Buzzer"
+    _watched_keys = frozenset(("buz", PENDING_COMMANDS))
 
     def __init__(self, coordinator: PetTracerCoordinator, dev_id: str) -> None:
         """Initialize the switch."""
-        super().__init__(coordinator)
-        self._dev_id = dev_id
+        super().__init__(coordinator, dev_id)
         
         # Initialize state from coordinator data
         data = self.coordinator.data.get(self._dev_id, {})
-        self._last_contact = data.get("lastContact")
         self._attr_is_on = data.get("buz") is True
         
     @property
@@ -125,25 +110,9 @@ class PetTracerBuzzerSwitch(CoordinatorEntity, SwitchEntity):
         return f"{self._dev_id}_buzzer"
 
     @property
-    def device_info(self) -> DeviceInfo:
-        """Return the device info."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        name = details.get("name") or f"Pet {self._dev_id}"
-        return DeviceInfo(
-            identifiers={(DOMAIN, str(self._dev_id))},
-            name=name,
-            manufacturer="PetTracer",
-            model="GPS Collar",
-            sw_version=self.coordinator.data.get(self._dev_id, {}).get("sw"),
-            configuration_url="https://portal.pettracer.com/",
-        )
-
-    @property
-    def name(self) -> str:
-        """Return the name of the entity."""
-        details = self.coordinator.data.get(self._dev_id, {}).get("details", {})
-        base_name = details.get("name") or f"Pet {self._dev_id}"
-        return f"{base_name} Buzzer"
+    def extra_state_attributes(self) -> dict:
+        """Return whether a command is awaiting confirmation."""
+        return {"pending": self._command_pending("buz")}
 
     async def async_turn_on(self, **kwargs) -> None:
         """Turn the switch on."""
@@ -161,12 +130,10 @@ class PetTracerBuzzerSwitch(CoordinatorEntity, SwitchEntity):
 
         await self.coordinator.set_buzzer(self._dev_id, False)
 
-    def _handle_coordinator_update(self) -> None:
-        """Handle coordinator update."""
+    def _handle_device_update(self) -> None:
+        """Handle device update."""
         data = self.coordinator.data.get(self._dev_id, {})
-        new_contact = data.get("lastContact")
-        
-        # Always update state (WebSocket pushes updates without requiring lastContact change)
-        self._last_contact = new_contact
-        self._attr_is_on = data.get("buz") is True
+        # Keep the optimistic state until the collar confirms the command
+        if not self._command_pending("buz"):
+            self._attr_is_on = data.get("buz") is True
         self.async_write_ha_state()
@@ -0,0 +1,46 @@
+"""Sampled WebSocket frame tracing for PetTracer."""
+from __future__ import annotations
+
+import time
+from collections import deque
+
+# Frames kept for the diagnostics download
+TRACE_BUFFER_SIZE = 200
+# Longer frames are cut down to this many characters
+TRACE_FRAME_CHARS = 2000
+
+
+class FrameTracer:
+    """Keep a sample of recent WebSocket frames in a ring buffer.
+
+    Callers check `enabled` before calling `record`, so a disabled tracer
+    costs one attribute lookup per frame.
+    """
+
+    def __init__(self, size: int = TRACE_BUFFER_SIZE) -> None:
+        """Initialize the tracer, disabled."""
+        self.enabled = False
+        self._sample_every = 1
+        self._seen = 0
+        self._frames: deque[tuple[float, str, str]] = deque(maxlen=size)
+
+    def configure(self, sample_rate: float) -> None:
+        """Trace roughly sample_rate of all frames, 0 turns tracing off."""
+        self.enabled = sample_rate > 0
+        self._sample_every = max(round(1 / sample_rate), 1) if self.enabled else 1
+        if not self.enabled:
+            self._frames.clear()
+
+    def record(self, direction: str, data: str) -> None:
+        """Record a frame sent ("out") or received ("in")."""
+        self._seen += 1
+        if self._seen % self._sample_every:
+            return
+        self._frames.append((time.time(), direction, data[:TRACE_FRAME_CHARS]))
+
+    def dump(self) -> list[dict]:
+        """Return the buffered frames, oldest first."""
+        return [
+            {"time": timestamp, "direction": direction, "data": data}
+            for timestamp, direction, data in self._frames
+        ]
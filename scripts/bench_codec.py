@@ -0,0 +1,80 @@
+"""Compare the per-message JSON decode cost of the available backends.
+
+Decodes a typical PetTracer push the way StompClient does: first the SockJS
+"a[...]" array, then the STOMP MESSAGE body inside it.
+
+Usage: python scripts/bench_codec.py [iterations]
+"""
+from __future__ import annotations
+
+import json
+import sys
+import timeit
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+PUSH = {
+    "id": 12345,
+    "type": 0,
+    "bat": 3987,
+    "chg": 0,
+    "led": False,
+    "buz": False,
+    "home": False,
+    "mode": 11,
+    "lastContact": "2024-05-01T12:34:56.000+0000",
+    "lastPos": {
+        "posLat": 51.501476,
+        "posLong": -0.140634,
+        "acc": 8,
+        "sat": 11,
+        "timeMeasure": "2024-05-01T12:34:55.000+0000",
+    },
+    "details": {"name": "Fluffy", "image": "abc123.jpg"},
+}
+
+
+def sockjs_message() -> str:
+    """Build a SockJS array frame carrying one STOMP MESSAGE."""
+    body = json.dumps(PUSH, separators=(",", ":"))
+    frame = (
+        "MESSAGE\n"
+        "destination:/user/queue/messages\n"
+        "subscription:sub-0\n"
+        f"content-length:{len(body.encode())}\n"
+        "\n"
+        f"{body}\u0000"
+    )
+    return "a" + json.dumps([frame], separators=(",", ":"))
+
+
+def decode(loads, message: str) -> dict:
+    """Decode a SockJS message and the STOMP body it carries."""
+    frame = loads(message[1:])[0]
+    return loads(frame[frame.index("\n\n") + 2 : -1])
+
+
+def main() -> None:
+    """Run the benchmark."""
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    message = sockjs_message()
+    backends = {"json": json.loads}
+    if orjson is not None:
+        backends["orjson"] = orjson.loads
+    else:
+        print("orjson not installed, only measuring json")
+
+    print(f"{len(message)} byte message, {iterations} iterations")
+    for name, loads in backends.items():
+        assert decode(loads, message) == PUSH
+        best = min(
+            timeit.repeat(lambda: decode(loads, message), number=iterations, repeat=5)
+        )
+        print(f"{name:>8}: {best / iterations * 1e6:.2f} us/message")
+
+
+if __name__ == "__main__":
+    main()
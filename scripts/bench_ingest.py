@@ -0,0 +1,196 @@
+"""Offline benchmark of the WebSocket ingest path.
+
+Feeds synthetic SockJS frames through StompClient._handle_message, the STOMP
+parser and PetTracerCoordinator._handle_ws_message, with one listener per
+device standing in for its entities. Nothing touches the network.
+
+Reports throughput, p50/p99 latency per SockJS message, the tracemalloc
+peak and the memory retained per message, and how many entity updates the
+pushes caused. Needs Home Assistant installed, run it from the
+repository root:
+
+    python scripts/bench_ingest.py [--messages N] [--coalesce]
+
+By default pushes are published immediately (batching window 0). With
+--coalesce the batching window is left on and pending updates are flushed
+after every SockJS message, as the timer would under sustained load.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+from custom_components.pettracer.const import CONF_WS_COALESCE_WINDOW  # noqa: E402
+from custom_components.pettracer.coordinator import PetTracerCoordinator  # noqa: E402
+from custom_components.pettracer.stomp_client import StompClient  # noqa: E402
+
+FLEET_SIZE = 20
+
+
+def push(dev_id: int, seq: int) -> dict:
+    """Return a push as the portal sends it in Live mode."""
+    return {
+        "id": dev_id,
+        "bat": 4000 - seq % 200,
+        "lastContact": f"2024-05-01T12:{seq // 60 % 60:02d}:{seq % 60:02d}.000+0000",
+        "lastPos": {
+            "posLat": 51.5 + seq * 1e-5,
+            "posLong": -0.14 + dev_id * 1e-4,
+            "acc": 5 + seq % 10,
+            "sat": 9,
+        },
+    }
+
+
+def stomp_message(body: dict) -> str:
+    """Wrap a push in a STOMP MESSAGE frame."""
+    payload = json.dumps(body, separators=(",", ":"))
+    return (
+        "MESSAGE\n"
+        "destination:/user/queue/messages\n"
+        "subscription:sub-0\n"
+        f"content-length:{len(payload.encode())}\n"
+        "\n"
+        f"{payload}\u0000"
+    )
+
+
+def sockjs(*frames: str) -> str:
+    """Wrap STOMP frames in a SockJS array frame."""
+    return "a" + json.dumps(list(frames), separators=(",", ":"))
+
+
+def scenarios(count: int, offset: int = 0) -> dict[str, tuple[list[str], int]]:
+    """Return (SockJS messages, pushes carried) for each scenario.
+
+    Pushes with different offsets carry different positions, so replaying a
+    scenario is never a no-op for the state store.
+    """
+    batch = 10
+    return {
+        "sockjs heartbeat": (["h"] * count, 0),
+        "stomp heartbeat": ([sockjs("\n")] * count, 0),
+        "single message": (
+            [sockjs(stomp_message(push(1, offset + i))) for i in range(count)],
+            count,
+        ),
+        f"batched array x{batch}": (
+            [
+                sockjs(*(stomp_message(push(1, offset + i * batch + j)) for j in range(batch)))
+                for i in range(count // batch)
+            ],
+            count // batch * batch,
+        ),
+        f"{FLEET_SIZE}-collar burst": (
+            [
+                sockjs(stomp_message(push(1 + i % FLEET_SIZE, offset + i // FLEET_SIZE)))
+                for i in range(count)
+            ],
+            count,
+        ),
+    }
+
+
+async def run_scenario(
+    client: StompClient,
+    coordinator: PetTracerCoordinator,
+    messages: list[str],
+    coalesce: bool,
+) -> list[float]:
+    """Feed messages through the ingest path, returning per-message ns."""
+    timings = []
+    for message in messages:
+        start = time.perf_counter_ns()
+        await client._handle_message(message)
+        # Let the callbacks StompClient schedules on the loop run
+        await asyncio.sleep(0)
+        if coalesce:
+            coordinator._flush_ws_updates()
+        timings.append(time.perf_counter_ns() - start)
+    return timings
+
+
+async def main(args: argparse.Namespace) -> None:
+    """Run every scenario and print a report."""
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        entry = SimpleNamespace(
+            entry_id="bench",
+            data={"email": "bench@example.com", "password": "bench"},
+            options={CONF_WS_COALESCE_WINDOW: 1 if args.coalesce else 0},
+        )
+        coordinator = PetTracerCoordinator(hass, entry)
+        coordinator.data = coordinator.store.data
+        coordinator.store.replace(
+            {str(dev_id): {"id": dev_id, "type": 0} for dev_id in range(1, FLEET_SIZE + 1)}
+        )
+
+        entity_writes = 0
+
+        def entity_update() -> None:
+            nonlocal entity_writes
+            entity_writes += 1
+
+        for dev_id in coordinator.data:
+            coordinator.async_add_device_listener(dev_id, entity_update)
+
+        client = StompClient(
+            hass,
+            "ws://localhost/sc",
+            "token",
+            list(range(1, FLEET_SIZE + 1)),
+            coordinator._handle_ws_message,
+            session=object(),
+        )
+
+        print(f"{'scenario':<22}{'msgs/s':>12}{'pushes/s':>12}{'p50 us':>10}"
+              f"{'p99 us':>10}{'peak KiB':>10}{'B/msg':>8}{'writes':>8}")
+        warmups = scenarios(100, offset=1_000_000)
+        traced = scenarios(args.messages, offset=2_000_000)
+        for name, (messages, pushes) in scenarios(args.messages).items():
+            # Warm up, then time without tracemalloc overhead
+            await run_scenario(client, coordinator, warmups[name][0], args.coalesce)
+            entity_writes = 0
+            start = time.perf_counter()
+            timings = await run_scenario(client, coordinator, messages, args.coalesce)
+            elapsed = time.perf_counter() - start
+            writes = entity_writes
+
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            await run_scenario(client, coordinator, traced[name][0], args.coalesce)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            timings.sort()
+            print(
+                f"{name:<22}"
+                f"{len(messages) / elapsed:>12,.0f}"
+                f"{pushes / elapsed:>12,.0f}"
+                f"{timings[len(timings) // 2] / 1000:>10.1f}"
+                f"{timings[int(len(timings) * 0.99)] / 1000:>10.1f}"
+                f"{(peak - before) / 1024:>10.1f}"
+                f"{(current - before) / len(messages):>8.0f}"
+                f"{writes:>8}"
+            )
+
+        print(f"\nws_stats: {coordinator.ws_stats}")
+        await hass.async_stop(force=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--coalesce", action="store_true")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,334 @@
+"""Local stand-in for the PetTracer cloud, for load and soak testing.
+
+Emulates the REST endpoints the integration calls and the SockJS/STOMP
+WebSocket that StompClient speaks, for a fleet of simulated collars. Point
+Home Assistant at it with:
+
+    PETTRACER_API_BASE_URL=http://localhost:8080/api
+    PETTRACER_WS_URL=ws://localhost:8080/sc
+
+Any email and password are accepted. Run with --help for the knobs
+(fleet size, push rate, latency, token expiry, random 401s and disconnects).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import secrets
+import time
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+_LOGGER = logging.getLogger("fake_cloud")
+
+# Mode numbers as used by the portal, see MODE_MAP in const.py
+MODES = (1, 2, 3, 7, 8, 11, 14)
+FIRST_COLLAR_ID = 10000
+FIRST_HOMESTATION_ID = 90000
+HOME = (51.5014, -0.1419)
+
+
+def now_iso() -> str:
+    """Return the current time the way the portal formats it."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000+0000")
+
+
+def compact(obj) -> str:
+    """Serialize like JSON.stringify."""
+    return json.dumps(obj, separators=(",", ":"))
+
+
+class FakeCloud:
+    """Simulated PetTracer account state and server behaviour."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        """Initialize the fleet."""
+        self.args = args
+        self.tokens: dict[str, float] = {}
+        self.sockets: dict[web.WebSocketResponse, set[int]] = {}
+        self.stats = {"logins": 0, "rest": 0, "401": 0, "pushes": 0, "disconnects": 0}
+        self.collars = {
+            dev_id: {
+                "id": dev_id,
+                "type": 0,
+                "bat": random.randint(3700, 4150),
+                "chg": 0,
+                "led": False,
+                "buz": False,
+                "home": True,
+                "mode": 2,
+                "sw": "1.9.3",
+                "hw": "2.1",
+                "accuWarn": 3600,
+                "lastContact": now_iso(),
+                "lastPos": {
+                    "posLat": HOME[0] + random.uniform(-0.002, 0.002),
+                    "posLong": HOME[1] + random.uniform(-0.002, 0.002),
+                    "acc": 10,
+                    "sat": 8,
+                },
+                "details": {"name": f"Pet {i + 1}", "image": None},
+            }
+            for i, dev_id in enumerate(
+                range(FIRST_COLLAR_ID, FIRST_COLLAR_ID + args.collars)
+            )
+        }
+        self.homestations = {
+            dev_id: {
+                "id": dev_id,
+                "type": 1,
+                "bat": 0,
+                "sw": "1.2.0",
+                "posLat": HOME[0],
+                "posLong": HOME[1],
+                "details": {"name": f"HomeStation {i + 1}"},
+            }
+            for i, dev_id in enumerate(
+                range(FIRST_HOMESTATION_ID, FIRST_HOMESTATION_ID + args.homestations)
+            )
+        }
+
+    # REST
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler):
+        """Add latency and enforce authentication on REST calls."""
+        if request.path.startswith("/api/"):
+            self.stats["rest"] += 1
+            if self.args.latency:
+                await asyncio.sleep(
+                    random.uniform(0.5, 1.5) * self.args.latency / 1000
+                )
+            if request.path != "/api/user/login" and not self._authorized(
+                request.headers.get("Authorization", "").removeprefix("Bearer ")
+            ):
+                self.stats["401"] += 1
+                return web.json_response({"error": "Unauthorized"}, status=401)
+        return await handler(request)
+
+    def _authorized(self, token: str) -> bool:
+        """Return whether a token is known, unexpired and not unlucky."""
+        expires = self.tokens.get(token)
+        if expires is None or expires < time.monotonic():
+            return False
+        return random.random() >= self.args.unauthorized_rate
+
+    async def login(self, request: web.Request) -> web.Response:
+        """Handle /user/login."""
+        body = await request.json()
+        if not body.get("login") or not body.get("password"):
+            return web.json_response({"error": "Bad credentials"}, status=401)
+        self.stats["logins"] += 1
+        token = secrets.token_urlsafe(24)
+        self.tokens[token] = time.monotonic() + self.args.token_ttl
+        return web.json_response({"access_token": token})
+
+    async def get_ccs(self, request: web.Request) -> web.Response:
+        """Handle /map/getccs."""
+        return web.json_response(list(self.collars.values()))
+
+    async def get_homestations(self, request: web.Request) -> web.Response:
+        """Handle /user/gethomestations."""
+        return web.json_response(list(self.homestations.values()))
+
+    async def set_mode(self, request: web.Request) -> web.Response:
+        """Handle /map/setccmode."""
+        body = await request.json()
+        collar = self.collars.get(body.get("devId"))
+        if collar is None or body.get("cmdNr") not in MODES:
+            return web.json_response({"error": "Bad request"}, status=400)
+        self._delayed_push(collar["id"], {"mode": body["cmdNr"]})
+        return web.json_response({})
+
+    async def set_flag(self, request: web.Request) -> web.Response:
+        """Handle /map/setccled/{id}/{state} and /map/setccbuz/{id}/{state}."""
+        collar = self.collars.get(int(request.match_info["dev_id"]))
+        state = request.match_info["state"]
+        if collar is None or state not in ("1", "2"):
+            return web.json_response({"error": "Bad request"}, status=400)
+        key = "led" if request.match_info["what"] == "led" else "buz"
+        self._delayed_push(collar["id"], {key: state == "1"})
+        return web.json_response({})
+
+    def _delayed_push(self, dev_id: int, fields: dict) -> None:
+        """Apply a command as the collar would, after it next checks in."""
+        delay = random.uniform(0.5, 1.5) * self.args.command_delay
+
+        def apply() -> None:
+            self.collars[dev_id].update(fields)
+            self.push(dev_id, fields)
+
+        asyncio.get_running_loop().call_later(delay, apply)
+
+    # SockJS / STOMP
+
+    def push(self, dev_id: int, fields: dict) -> None:
+        """Send a STOMP MESSAGE to every socket subscribed to a device."""
+        body = compact({"id": dev_id, "lastContact": now_iso(), **fields})
+        frame = (
+            "MESSAGE\n"
+            "destination:/user/queue/messages\n"
+            "subscription:sub-0\n"
+            f"message-id:{secrets.token_hex(4)}\n"
+            f"content-length:{len(body.encode())}\n"
+            "\n"
+            f"{body}\u0000"
+        )
+        data = "a" + compact([frame])
+        for ws, devices in self.sockets.items():
+            if dev_id in devices and not ws.closed:
+                self.stats["pushes"] += 1
+                asyncio.create_task(ws.send_str(data))
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """Handle /sc/{server}/{session}/websocket."""
+        if not self._authorized(request.query.get("access_token", "")):
+            self.stats["401"] += 1
+            raise web.HTTPUnauthorized()
+
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets[ws] = set()
+        heartbeat = asyncio.create_task(self._heartbeat(ws))
+        await ws.send_str("o")
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+                for frame in json.loads(msg.data):
+                    await self._handle_frame(ws, frame)
+        finally:
+            heartbeat.cancel()
+            del self.sockets[ws]
+        return ws
+
+    async def _handle_frame(self, ws: web.WebSocketResponse, frame: str) -> None:
+        """Handle a STOMP frame sent by the client."""
+        command, _, rest = frame.partition("\n")
+        headers, _, body = rest.partition("\n\n")
+        body = body.rstrip("\u0000")
+        if command == "CONNECT":
+            await ws.send_str(
+                "a" + compact(["CONNECTED\nversion:1.1\nheart-beat:10000,10000\n\n\u0000"])
+            )
+        elif command == "SEND" and "destination:/app/subscribe" in headers:
+            self.sockets[ws].update(json.loads(body).get("deviceIds", []))
+        elif command == "SEND" and "destination:/app/unsubscribe" in headers:
+            self.sockets[ws].difference_update(json.loads(body).get("deviceIds", []))
+
+    async def _heartbeat(self, ws: web.WebSocketResponse) -> None:
+        """Send SockJS heartbeats and randomly drop the connection."""
+        started = time.monotonic()
+        lifetime = (
+            random.expovariate(1 / self.args.disconnect_every)
+            if self.args.disconnect_every
+            else None
+        )
+        while not ws.closed:
+            await asyncio.sleep(min(25, lifetime or 25))
+            if lifetime and time.monotonic() - started >= lifetime:
+                self.stats["disconnects"] += 1
+                await ws.send_str('c[3000,"Go away!"]')
+                await ws.close()
+                return
+            await ws.send_str("h")
+
+    # Simulation
+
+    async def simulate(self) -> None:
+        """Move collars around and push their positions."""
+        if self.args.push_rate <= 0:
+            return
+        interval = 1 / (self.args.push_rate * max(len(self.collars), 1))
+        collars = list(self.collars.values())
+        while True:
+            await asyncio.sleep(interval)
+            collar = random.choice(collars)
+            pos = collar["lastPos"]
+            pos["posLat"] += random.uniform(-0.0001, 0.0001)
+            pos["posLong"] += random.uniform(-0.0001, 0.0001)
+            pos["acc"] = random.randint(3, 30)
+            collar["bat"] = max(3000, collar["bat"] - random.randint(0, 1))
+            collar["lastContact"] = now_iso()
+            self.push(collar["id"], {"bat": collar["bat"], "lastPos": dict(pos)})
+
+    async def report(self) -> None:
+        """Log counters periodically."""
+        while True:
+            await asyncio.sleep(self.args.report_every)
+            _LOGGER.info(
+                "sockets=%d %s",
+                len(self.sockets),
+                " ".join(f"{k}={v}" for k, v in self.stats.items()),
+            )
+
+
+def build_app(args: argparse.Namespace) -> web.Application:
+    """Create the aiohttp application."""
+    cloud = FakeCloud(args)
+    app = web.Application(middlewares=[cloud.middleware])
+    app.add_routes(
+        [
+            web.post("/api/user/login", cloud.login),
+            web.get("/api/map/getccs", cloud.get_ccs),
+            web.get("/api/user/gethomestations", cloud.get_homestations),
+            web.post("/api/map/setccmode", cloud.set_mode),
+            web.post(r"/api/map/setcc{what:(led|buz)}/{dev_id:\d+}/{state}", cloud.set_flag),
+            web.get("/sc/{server}/{session}/websocket", cloud.websocket),
+        ]
+    )
+
+    async def background(app: web.Application):
+        tasks = [asyncio.create_task(cloud.simulate())]
+        if args.report_every:
+            tasks.append(asyncio.create_task(cloud.report()))
+        yield
+        for task in tasks:
+            task.cancel()
+
+    app.cleanup_ctx.append(background)
+    return app
+
+
+def main() -> None:
+    """Parse arguments and serve."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--collars", type=int, default=5)
+    parser.add_argument("--homestations", type=int, default=1)
+    parser.add_argument(
+        "--push-rate", type=float, default=0.2,
+        help="position pushes per collar per second",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0, help="mean REST latency in ms"
+    )
+    parser.add_argument(
+        "--token-ttl", type=float, default=3600, help="seconds a login token is valid"
+    )
+    parser.add_argument(
+        "--unauthorized-rate", type=float, default=0,
+        help="fraction of authenticated calls answered with 401",
+    )
+    parser.add_argument(
+        "--disconnect-every", type=float, default=0,
+        help="mean seconds before the server drops a WebSocket, 0 to never",
+    )
+    parser.add_argument(
+        "--command-delay", type=float, default=2,
+        help="mean seconds before a command shows up as a push",
+    )
+    parser.add_argument("--report-every", type=float, default=30)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    web.run_app(build_app(args), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Tests for the incremental STOMP frame parser."""
+from __future__ import annotations
+
+import json
+
+from custom_components.pettracer.stomp_parser import (
+    MAX_BUFFER_SIZE,
+    StompFrame,
+    StompFrameParser,
+)
+
+MESSAGE = (
+    "MESSAGE\n"
+    "destination:/user/queue/portal\n"
+    "subscription:sub-0\n"
+    "\n"
+    '{"id":10000,"bat":4012}'
+    "\0"
+)
+CONNECTED = "CONNECTED\nversion:1.1\nheart-beat:10000,10000\n\n\0"
+
+
+def _feed_all(parser: StompFrameParser, *pieces: str) -> list[StompFrame]:
+    """Feed pieces one after another and return every frame produced."""
+    frames: list[StompFrame] = []
+    for piece in pieces:
+        frames.extend(parser.feed(piece))
+    return frames
+
+
+def test_single_frame() -> None:
+    """Test a complete frame in one piece."""
+    frames = StompFrameParser().feed(MESSAGE)
+    assert frames == [
+        StompFrame(
+            "MESSAGE",
+            {"destination": "/user/queue/portal", "subscription": "sub-0"},
+            '{"id":10000,"bat":4012}',
+        )
+    ]
+
+
+def test_every_split_point() -> None:
+    """Test a frame split in two at every position."""
+    expected = StompFrameParser().feed(MESSAGE)
+    for split in range(1, len(MESSAGE)):
+        parser = StompFrameParser()
+        assert parser.feed(MESSAGE[:split]) == []
+        assert parser.buffered == split
+        assert parser.feed(MESSAGE[split:]) == expected
+        assert parser.buffered == 0
+
+
+def test_one_character_at_a_time() -> None:
+    """Test a stream of several frames fed character by character."""
+    stream = CONNECTED + "\n" + MESSAGE + MESSAGE
+    frames = _feed_all(StompFrameParser(), *stream)
+    assert [frame.command for frame in frames] == ["CONNECTED", "MESSAGE", "MESSAGE"]
+
+
+def test_several_frames_in_one_feed() -> None:
+    """Test concatenated frames with heart-beats between them."""
+    parser = StompFrameParser()
+    frames = parser.feed(CONNECTED + "\n\r\n" + MESSAGE + "\n" + MESSAGE[:10])
+    assert [frame.command for frame in frames] == ["CONNECTED", "MESSAGE"]
+    assert parser.buffered == 10
+    assert [frame.command for frame in parser.feed(MESSAGE[10:])] == ["MESSAGE"]
+
+
+def test_heart_beats_only() -> None:
+    """Test bare EOLs produce no frames and leave nothing buffered."""
+    parser = StompFrameParser()
+    assert parser.feed("\n") == []
+    assert parser.feed("\r\n\n") == []
+    assert parser.buffered == 0
+
+
+def test_content_length_with_nul_in_body() -> None:
+    """Test a body holding NUL is read up to its content-length."""
+    body = "a\0b"
+    frame = f"MESSAGE\ncontent-length:{len(body)}\n\n{body}\0"
+    parser = StompFrameParser()
+    assert parser.feed(frame + CONNECTED) == [
+        StompFrame("MESSAGE", {"content-length": "3"}, body),
+        StompFrame("CONNECTED", {"version": "1.1", "heart-beat": "10000,10000"}, ""),
+    ]
+
+
+def test_content_length_counts_utf8_bytes() -> None:
+    """Test content-length in bytes for a body with non-ASCII characters."""
+    body = json.dumps({"name": "Mieze äöü \U0001f408", "x": "\0"}, ensure_ascii=False)
+    frame = f"MESSAGE\ncontent-length:{len(body.encode())}\n\n{body}\0"
+    for split in range(1, len(frame)):
+        parser = StompFrameParser()
+        frames = _feed_all(parser, frame[:split], frame[split:])
+        assert [f.body for f in frames] == [body]
+        assert parser.buffered == 0
+
+
+def test_wrong_content_length_falls_back_to_nul() -> None:
+    """Test a content-length that does not end at a NUL is ignored."""
+    frame = "MESSAGE\ncontent-length:2\n\nhello\0"
+    assert [f.body for f in StompFrameParser().feed(frame)] == ["hello"]
+
+
+def test_crlf_headers() -> None:
+    """Test frames using CRLF line endings."""
+    frame = "MESSAGE\r\ndestination:/topic/a\r\nfoo:bar\r\n\r\nbody\0"
+    for split in range(1, len(frame)):
+        frames = _feed_all(StompFrameParser(), frame[:split], frame[split:])
+        assert frames == [
+            StompFrame("MESSAGE", {"destination": "/topic/a", "foo": "bar"}, "body")
+        ]
+
+
+def test_header_escapes_and_repeats() -> None:
+    """Test escaped header values are decoded and the first repeat wins."""
+    frame = "MESSAGE\nkey:a\\cb\\nc\\\\d\nkey:second\n\n\0"
+    assert StompFrameParser().feed(frame)[0].headers == {"key": "a:b\nc\\d"}
+
+
+def test_buffer_cap() -> None:
+    """Test an unterminated frame is dropped once it outgrows the cap."""
+    parser = StompFrameParser()
+    assert parser.feed("MESSAGE\n\n" + "x" * MAX_BUFFER_SIZE) == []
+    assert parser.buffered == 0
+    # The parser recovers with the next frame
+    assert [f.command for f in parser.feed(MESSAGE)] == ["MESSAGE"]
+
+
+def test_buffer_below_cap_is_kept() -> None:
+    """Test a partial frame under the cap stays buffered."""
+    parser = StompFrameParser()
+    partial = "MESSAGE\n\n" + "x" * 1000
+    assert parser.feed(partial) == []
+    assert parser.buffered == len(partial)
+
+
+def test_reset() -> None:
+    """Test reset drops a partial frame."""
+    parser = StompFrameParser()
+    parser.feed(MESSAGE[:20])
+    parser.reset()
+    assert parser.buffered == 0
+    assert [f.command for f in parser.feed(CONNECTED)] == ["CONNECTED"]